@@ -0,0 +1,225 @@
+"""
+Agente local de desbloqueo (al estilo de ssh-agent).
+
+Mantiene en memoria las claves ya derivadas de las bóvedas desbloqueadas y las
+entrega por un socket Unix a los procesos del mismo usuario, de modo que la CLI,
+los scripts y la interfaz gráfica no repiten la derivación PBKDF2 en cada uso.
+
+    python agent.py start [--idle-timeout SEGUNDOS]
+    python agent.py status | lock | stop
+
+El socket vive en un directorio propio con permisos 0700 y, en Linux, además se
+comprueba el UID del proceso que se conecta (SO_PEERCRED). Tras 'idle-timeout'
+segundos sin peticiones el agente olvida las claves y termina.
+"""
+import argparse
+import json
+import os
+import select
+import socket
+import struct
+import sys
+import time
+
+# --- Constants ---
+AGENT_SOCKET_ENV = "GESTION_CLAVES_AGENT_SOCK"
+DEFAULT_IDLE_TIMEOUT = 15 * 60
+CLIENT_TIMEOUT = 2.0 # Seconds a client waits for the agent before giving up
+SERVER_READ_TIMEOUT = 0.2 # Connections are served one at a time, so a stalled client may only hold the others this long
+MAX_REQUEST_SIZE = 64 * 1024
+REQUIRED_FIELDS = {"get": ("vault",), "add": ("vault", "key"), "forget": ("vault",)} # String fields per operation
+
+def agent_supported() -> bool:
+    return hasattr(socket, "AF_UNIX") and hasattr(os, "getuid")
+
+def default_socket_path() -> str:
+    path = os.environ.get(AGENT_SOCKET_ENV)
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return os.path.join(runtime_dir, f"gestion-claves-{os.getuid()}", "agent.sock")
+
+def vault_id(vault_path: str) -> str:
+    return os.path.realpath(vault_path)
+
+def check_private_dir(path: str):
+    """
+    Exige que el directorio del socket pertenezca al usuario y no sea accesible por otros.
+    """
+    info = os.stat(path)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"El directorio del agente no es privado: {path}")
+
+def peer_uid(conn: socket.socket):
+    """
+    UID del proceso conectado (solo Linux); None si la plataforma no lo permite.
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)[1]
+
+# --- Server ---
+class UnlockAgent:
+    """
+    Servidor del agente: guarda claves por bóveda y responde peticiones JSON de una línea.
+    """
+    def __init__(self, socket_path: str = None, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        self.socket_path = socket_path or default_socket_path()
+        self.idle_timeout = idle_timeout
+        self.keys = {}
+        self.running = False
+        self.last_activity = time.monotonic()
+
+    def serve_forever(self):
+        socket_dir = os.path.dirname(self.socket_path)
+        os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+        check_private_dir(socket_dir)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path) # Stale socket from an agent that did not shut down cleanly
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            server.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        server.listen(16)
+        self.running = True
+        self.last_activity = time.monotonic()
+        try:
+            while self.running:
+                remaining = self.idle_timeout - (time.monotonic() - self.last_activity)
+                if remaining <= 0:
+                    break
+                readable, _, _ = select.select([server], [], [], min(remaining, 1.0))
+                if readable:
+                    conn, _ = server.accept()
+                    with conn:
+                        try:
+                            self._handle(conn)
+                        except Exception as e: # One bad client must never take the agent (and its keys) down
+                            print(f"Petición descartada: {e!r}", file=sys.stderr)
+        finally:
+            self.keys.clear()
+            server.close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def _handle(self, conn: socket.socket):
+        conn.settimeout(SERVER_READ_TIMEOUT)
+        uid = peer_uid(conn)
+        if uid is not None and uid != os.getuid():
+            conn.sendall(b'{"ok":false,"error":"forbidden"}\n')
+            return
+        try:
+            request = json.loads(_recv_line(conn))
+            response = self.dispatch(request)
+        except (OSError, ValueError) as e:
+            response = {"ok": False, "error": str(e)}
+        self.last_activity = time.monotonic()
+        conn.sendall(json.dumps(response).encode() + b"\n")
+
+    def dispatch(self, request) -> dict:
+        if not isinstance(request, dict):
+            raise ValueError("la petición debe ser un objeto JSON")
+        op = request.get("op")
+        for field in REQUIRED_FIELDS.get(op, ()):
+            if not isinstance(request.get(field), str):
+                raise ValueError(f"falta el campo '{field}'")
+        if op == "get":
+            key = self.keys.get(request["vault"])
+            return {"ok": key is not None, "key": key}
+        if op == "add":
+            self.keys[request["vault"]] = request["key"]
+            return {"ok": True}
+        if op == "forget":
+            self.keys.pop(request["vault"], None)
+            return {"ok": True}
+        if op == "lock":
+            self.keys.clear()
+            return {"ok": True}
+        if op == "status":
+            return {"ok": True, "vaults": sorted(self.keys), "idle_timeout": self.idle_timeout}
+        if op == "stop":
+            self.running = False
+            return {"ok": True}
+        return {"ok": False, "error": f"operación desconocida: {op}"}
+
+def _recv_line(conn: socket.socket) -> bytes:
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > MAX_REQUEST_SIZE:
+            raise ValueError("petición demasiado grande")
+    return data
+
+# --- Client ---
+def request(payload: dict, socket_path: str = None):
+    """
+    Envía una petición al agente. Devuelve la respuesta, o None si no hay agente disponible.
+    """
+    if not agent_supported():
+        return None
+    socket_path = socket_path or default_socket_path()
+    try:
+        check_private_dir(os.path.dirname(socket_path))
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(CLIENT_TIMEOUT)
+            conn.connect(socket_path)
+            conn.sendall(json.dumps(payload).encode() + b"\n")
+            return json.loads(_recv_line(conn))
+    except (OSError, ValueError):
+        return None
+
+def get_key(vault_path: str, socket_path: str = None):
+    """
+    Clave derivada de la bóveda si el agente la tiene; None en cualquier otro caso.
+    """
+    response = request({"op": "get", "vault": vault_id(vault_path)}, socket_path)
+    if response and response.get("ok"):
+        return response["key"].encode()
+    return None
+
+def add_key(vault_path: str, key: bytes, socket_path: str = None) -> bool:
+    response = request({"op": "add", "vault": vault_id(vault_path), "key": key.decode()}, socket_path)
+    return bool(response and response.get("ok"))
+
+def forget_key(vault_path: str, socket_path: str = None) -> bool:
+    """
+    Hace que el agente olvide la clave de esta bóveda (las demás se conservan).
+    """
+    response = request({"op": "forget", "vault": vault_id(vault_path)}, socket_path)
+    return bool(response and response.get("ok"))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="gestion-claves-agent", description="Agente local de desbloqueo de la bóveda.")
+    parser.add_argument("--socket", default=None, help=f"ruta del socket (por defecto ${AGENT_SOCKET_ENV} o $XDG_RUNTIME_DIR)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    start_parser = commands.add_parser("start", help="iniciar el agente en primer plano")
+    start_parser.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT, help="segundos de inactividad antes de olvidar las claves y salir")
+    commands.add_parser("status", help="mostrar las bóvedas desbloqueadas")
+    commands.add_parser("lock", help="olvidar todas las claves")
+    commands.add_parser("stop", help="detener el agente")
+    args = parser.parse_args(argv)
+
+    if not agent_supported():
+        print("Esta plataforma no admite sockets Unix.", file=sys.stderr)
+        return 1
+    if args.command == "start":
+        print(f"Agente escuchando en {args.socket or default_socket_path()}", file=sys.stderr)
+        UnlockAgent(args.socket, args.idle_timeout).serve_forever()
+        return 0
+    response = request({"op": args.command}, args.socket)
+    if response is None:
+        print("No hay ningún agente en ejecución.", file=sys.stderr)
+        return 1
+    if args.command == "status":
+        for path in response.get("vaults", []):
+            print(path)
+    return 0 if response.get("ok") else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
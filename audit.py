@@ -0,0 +1,435 @@
+"""
+Auditoría de la salud de las contraseñas de toda la bóveda.
+
+Para cada entrada calcula la entropía y las clases de caracteres usadas, detecta las
+contraseñas repetidas (agrupando por un HMAC con una clave aleatoria que solo vive en
+memoria, nunca por la contraseña en claro) y, si hay un índice de contraseñas filtradas,
+cuántas veces aparece en él.
+
+El índice se construye una vez a partir de una lista estilo "Pwned Passwords" (una línea
+SHA1:apariciones por contraseña, en cualquier orden) o de una lista de contraseñas en claro:
+
+    python audit.py build pwned-passwords-sha1.txt [--output ruta.idx]
+    python audit.py build diccionario.txt --plain
+
+y se consulta mapeado en memoria: solo se leen las páginas del cubo de 16 bits del hash
+buscado, así que abrirlo es instantáneo aunque ocupe gigas.
+
+Los resultados se guardan por entrada junto con su revisión (VaultStore.revision), de modo
+que una nueva auditoría solo descifra y analiza las entradas que cambiaron. Con muchas
+entradas pendientes el trabajo se reparte entre procesos, que leen y descifran su parte
+de la bóveda directamente del archivo.
+"""
+import argparse
+import hashlib
+import hmac
+import math
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import diagnostics
+import registry
+from diagnostics import timed
+from vault import Fernet, InvalidToken, decrypt_secret_line
+
+# --- Constants ---
+MIN_LENGTH = 12
+WEAK_ENTROPY_BITS = 50.0
+STRONG_ENTROPY_BITS = 80.0
+STRENGTH_LABELS = ("muy débil", "débil", "aceptable", "fuerte")
+CHAR_CLASSES = ("lower", "upper", "digit", "symbol", "other")
+CLASS_POOL_SIZES = {"lower": 26, "upper": 26, "digit": 10, "symbol": 33, "other": 128}
+ISSUE_LABELS = {
+    "empty": "sin contraseña",
+    "short": f"menos de {MIN_LENGTH} caracteres",
+    "weak": "entropía baja",
+    "single_class": "un solo tipo de carácter",
+    "reused": "repetida en otras entradas",
+    "breached": "aparece en filtraciones",
+}
+PARALLEL_MIN_ENTRIES = 5000 # Below this, starting worker processes costs more than it saves
+AUDIT_CHUNK_SIZE = 2000
+PROGRESS_EVERY = 1000
+
+BREACH_INDEX_FILE = "breached.idx"
+BREACH_MAGIC = b"GCBREACH"
+BREACH_VERSION = 1
+BREACH_HEADER = struct.Struct("<8sII") # magic, version, record count
+BREACH_BUCKETS = 1 << 16 # Records are grouped by the first two bytes of the SHA-1
+BREACH_TABLE = struct.Struct(f"<{BREACH_BUCKETS + 1}I") # First record of each bucket, plus the end
+BREACH_SUFFIX_SIZE = 8 # Digest bytes kept after the bucket prefix; false positives stay below 1e-15
+BREACH_RECORD = struct.Struct(f"<{BREACH_SUFFIX_SIZE}sI") # digest suffix, times seen
+BREACH_MAX_COUNT = 0xFFFFFFFF
+
+# --- Password analysis ---
+def char_class(char: str) -> str:
+    if "a" <= char <= "z":
+        return "lower"
+    if "A" <= char <= "Z":
+        return "upper"
+    if "0" <= char <= "9":
+        return "digit"
+    if " " <= char <= "~":
+        return "symbol"
+    return "other"
+
+def password_entropy(password: str, classes) -> float:
+    """
+    Entropía estimada en bits: log2 del alfabeto por carácter, salvo en repeticiones y
+    secuencias ("aaaa", "1234", "cba"), donde cada carácter extra aporta solo 1 bit.
+    """
+    if not password:
+        return 0.0
+    bits_per_char = math.log2(sum(CLASS_POOL_SIZES[name] for name in classes))
+    bits = bits_per_char
+    for previous, char in zip(password, password[1:]):
+        bits += 1.0 if abs(ord(char) - ord(previous)) <= 1 else bits_per_char
+    return bits
+
+def strength(entropy: float) -> int:
+    """
+    Índice en STRENGTH_LABELS.
+    """
+    if entropy < 28:
+        return 0
+    if entropy < WEAK_ENTROPY_BITS:
+        return 1
+    if entropy < STRONG_ENTROPY_BITS:
+        return 2
+    return 3
+
+def analyze_password(password: str) -> dict:
+    """
+    Longitud, clases de caracteres, entropía, fortaleza y problemas de una contraseña aislada
+    (la repetición entre entradas se calcula después, sobre toda la bóveda).
+    """
+    classes = [name for name in CHAR_CLASSES if name in {char_class(char) for char in password}]
+    entropy = password_entropy(password, classes)
+    issues = []
+    if not password:
+        issues.append("empty")
+    else:
+        if len(password) < MIN_LENGTH:
+            issues.append("short")
+        if entropy < WEAK_ENTROPY_BITS:
+            issues.append("weak")
+        if len(classes) == 1:
+            issues.append("single_class")
+    return {
+        "length": len(password),
+        "classes": classes,
+        "entropy": round(entropy, 1),
+        "strength": strength(entropy),
+        "breached": 0,
+        "issues": issues,
+    }
+
+def check_password(password: str, reuse_key: bytes, breach_index=None) -> tuple:
+    """
+    Devuelve (análisis, huella para agrupar repetidas); la huella es None si no hay contraseña.
+    """
+    analysis = analyze_password(password)
+    if not password:
+        return analysis, None
+    encoded = password.encode("utf-8")
+    if breach_index is not None:
+        analysis["breached"] = breach_index.count(hashlib.sha1(encoded).digest())
+        if analysis["breached"]:
+            analysis["issues"].append("breached")
+    return analysis, hmac.digest(reuse_key, encoded, "sha256")
+
+# --- Breach index ---
+def default_breach_index_path() -> str:
+    return os.path.join(registry.config_dir(), BREACH_INDEX_FILE)
+
+class BreachIndex:
+    """
+    Índice de hashes SHA-1 filtrados, mapeado en memoria.
+
+    Formato: cabecera, tabla de 65537 posiciones (inicio de cada cubo según los dos
+    primeros bytes del hash) y registros ordenados de 12 bytes (8 bytes siguientes del
+    hash + número de apariciones). Una consulta es una búsqueda binaria dentro de su cubo.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.records = BREACH_HEADER.unpack_from(self._mm, 0)
+        if magic != BREACH_MAGIC or version != BREACH_VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} no es un índice de contraseñas filtradas válido")
+        self._records_offset = BREACH_HEADER.size + BREACH_TABLE.size
+
+    def __len__(self) -> int:
+        return self.records
+
+    def count(self, sha1_digest: bytes) -> int:
+        """
+        Número de apariciones del hash en el índice (0 si no está).
+        """
+        mm = self._mm
+        bucket = int.from_bytes(sha1_digest[:2], "big")
+        low, high = struct.unpack_from("<II", mm, BREACH_HEADER.size + bucket * 4)
+        suffix = sha1_digest[2:2 + BREACH_SUFFIX_SIZE]
+        while low < high:
+            middle = (low + high) // 2
+            position = self._records_offset + middle * BREACH_RECORD.size
+            probe = mm[position:position + BREACH_SUFFIX_SIZE]
+            if probe < suffix:
+                low = middle + 1
+            elif probe > suffix:
+                high = middle
+            else:
+                return BREACH_RECORD.unpack_from(mm, position)[1] or 1
+        return 0
+
+    def close(self):
+        self._mm.close()
+
+def _parse_breach_line(line: str, plain: bool):
+    if plain:
+        password = line.rstrip("\r\n")
+        return (hashlib.sha1(password.encode("utf-8")).digest(), 1) if password else None
+    line = line.strip()
+    if not line:
+        return None
+    hex_digest, _, count = line.partition(":")
+    digest = bytes.fromhex(hex_digest)
+    if len(digest) != 20:
+        raise ValueError
+    return digest, min(int(count or 1), BREACH_MAX_COUNT)
+
+def build_breach_index(lines, path: str, plain: bool = False, progress=None) -> int:
+    """
+    Crea el índice en 'path' a partir de líneas "SHA1[:apariciones]" (o contraseñas en claro
+    con 'plain'). Reparte los hashes en 256 archivos temporales por su primer byte y ordena
+    cada uno por separado, así que la memoria usada es la de 1/256 de la lista.
+    Devuelve el número de hashes distintos.
+    """
+    staged = struct.Struct(f"<{1 + BREACH_SUFFIX_SIZE}sI") # second prefix byte + suffix, count
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        parts = [open(os.path.join(tmp, f"{i:02x}"), "w+b") for i in range(256)]
+        try:
+            for number, line in enumerate(lines, 1):
+                try:
+                    parsed = _parse_breach_line(line, plain)
+                except ValueError:
+                    raise ValueError(f"Línea {number} no válida: se esperaba SHA1[:apariciones]") from None
+                if parsed is not None:
+                    digest, count = parsed
+                    parts[digest[0]].write(staged.pack(digest[1:2 + BREACH_SUFFIX_SIZE], count))
+                if progress is not None and number % 1000000 == 0:
+                    progress(number)
+
+            table = [0] * (BREACH_BUCKETS + 1)
+            total = 0
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as out:
+                out.write(b"\0" * (BREACH_HEADER.size + BREACH_TABLE.size))
+                for first, part in enumerate(parts):
+                    part.seek(0)
+                    data = part.read()
+                    records = sorted(data[i:i + staged.size] for i in range(0, len(data), staged.size))
+                    previous, merged = None, 0
+                    for record in records + [None]:
+                        key = record[:1 + BREACH_SUFFIX_SIZE] if record is not None else None
+                        if key != previous and previous is not None:
+                            out.write(BREACH_RECORD.pack(previous[1:], min(merged, BREACH_MAX_COUNT)))
+                            table[(first << 8 | previous[0]) + 1] += 1
+                            total += 1
+                            merged = 0
+                        if record is not None:
+                            merged += staged.unpack(record)[1]
+                        previous = key
+                for bucket in range(BREACH_BUCKETS):
+                    table[bucket + 1] += table[bucket] # Counts -> cumulative start positions
+                out.seek(0)
+                out.write(BREACH_HEADER.pack(BREACH_MAGIC, BREACH_VERSION, total))
+                out.write(BREACH_TABLE.pack(*table))
+            os.replace(tmp_path, path)
+        finally:
+            for part in parts:
+                part.close()
+    return total
+
+# --- Parallel workers ---
+_worker = {}
+
+def _init_worker(key: bytes, path: str, reuse_key: bytes, breach_path: str):
+    diagnostics.profile_current_thread()
+    _worker["fernet"] = Fernet(key)
+    _worker["path"] = path
+    _worker["reuse_key"] = reuse_key
+    _worker["breach_index"] = BreachIndex(breach_path) if breach_path else None
+
+def _audit_chunk(located: list) -> tuple:
+    """
+    Lee y descifra en el proceso trabajador los secretos de 'located' (servicio, offset, longitud).
+    Devuelve los resultados y los servicios que no pudo leer porque el archivo se reescribió entretanto.
+    """
+    results, retry = [], []
+    fernet = _worker["fernet"]
+    with open(_worker["path"], "rb") as f:
+        for service, offset, length in located:
+            f.seek(offset)
+            try:
+                secret = decrypt_secret_line(fernet, f.read(length), service)
+            except (InvalidToken, ValueError): # Unreadable or another service's record (RecordMismatch)
+                retry.append(service)
+                continue
+            results.append((service, *check_password(secret.get("password", ""), _worker["reuse_key"], _worker["breach_index"])))
+    return results, retry
+
+# --- Auditor ---
+class Auditor:
+    """
+    Audita una bóveda y recuerda el resultado de cada entrada mientras no cambie.
+
+    La clave de las huellas de repetición es aleatoria y solo existe en esta instancia:
+    al descartarla (p. ej. al bloquear) no queda nada comparable con las contraseñas.
+    """
+    def __init__(self, breach_path: str = None, workers: int = None):
+        if breach_path is None and os.path.exists(default_breach_index_path()):
+            breach_path = default_breach_index_path()
+        self.breach_path = breach_path or None # "" disables the default index
+        self.breach_index = BreachIndex(breach_path) if breach_path else None
+        self.workers = workers or os.cpu_count() or 1
+        self._reuse_key = os.urandom(32)
+        self._cache = {} # service -> (revision, analysis, reuse fingerprint)
+
+    def clear(self):
+        self._cache.clear()
+
+    @timed("audit.run")
+    def audit(self, vault, progress=None) -> dict:
+        """
+        Audita 'vault' y devuelve {"entries": {servicio: análisis}, "reused": [[servicios]], "summary": {...}}.
+        Solo se descifran las entradas nuevas o modificadas desde la auditoría anterior.
+        'progress(n)' recibe el número de entradas analizadas en esta pasada.
+        """
+        start = time.perf_counter()
+        services = list(vault.services())
+        live = set(services)
+        for service in [service for service in self._cache if service not in live]:
+            del self._cache[service]
+        revisions = {service: vault.revision(service) for service in services}
+        stale = [service for service in services
+                 if revisions[service] is None or self._cache.get(service, (None,))[0] != revisions[service]]
+        diagnostics.add("audit.entries_checked", len(stale))
+
+        done = 0
+        def store(service: str, analysis: dict, fingerprint: bytes):
+            nonlocal done
+            self._cache[service] = (revisions[service], analysis, fingerprint)
+            done += 1
+            if progress is not None and done % PROGRESS_EVERY == 0:
+                progress(done)
+
+        pending = stale
+        if self.workers > 1 and len(stale) >= PARALLEL_MIN_ENTRIES:
+            located, pending = vault.secret_locations(stale)
+            pending += self._audit_parallel(vault, located, store)
+        for service, data in vault.items(services=pending):
+            store(service, *check_password(data.get("password", ""), self._reuse_key, self.breach_index))
+        if progress is not None:
+            progress(done)
+        return self._report(services, done, time.perf_counter() - start)
+
+    def _audit_parallel(self, vault, located: list, store) -> list:
+        chunks = [located[i:i + AUDIT_CHUNK_SIZE] for i in range(0, len(located), AUDIT_CHUNK_SIZE)]
+        retry = []
+        # spawn, not fork: the GUI process has Tk and worker threads that must not be cloned
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(chunks)), mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(vault.key, vault.path, self._reuse_key, self.breach_path)) as pool:
+            for results, failed in pool.map(_audit_chunk, chunks):
+                for result in results:
+                    store(*result)
+                retry.extend(failed)
+        return retry
+
+    def _report(self, services: list, checked: int, seconds: float) -> dict:
+        groups = {}
+        for service in services:
+            cached = self._cache.get(service)
+            if cached is not None and cached[2] is not None:
+                groups.setdefault(cached[2], []).append(service)
+        reused = sorted((sorted(group) for group in groups.values() if len(group) > 1), key=len, reverse=True)
+        reused_services = {service for group in reused for service in group}
+
+        entries = {}
+        issue_counts = dict.fromkeys(ISSUE_LABELS, 0)
+        for service in services:
+            cached = self._cache.get(service)
+            if cached is None:
+                continue # Deleted while the audit was running
+            analysis = cached[1]
+            issues = analysis["issues"] + ["reused"] if service in reused_services else analysis["issues"]
+            entries[service] = {**analysis, "issues": issues}
+            for issue in issues:
+                issue_counts[issue] += 1
+        return {
+            "entries": entries,
+            "reused": reused,
+            "summary": {
+                "total": len(entries),
+                "flagged": sum(1 for analysis in entries.values() if analysis["issues"]),
+                "checked": checked,
+                "issues": issue_counts,
+                "breach_index": self.breach_path,
+                "seconds": round(seconds, 3),
+            },
+        }
+
+def format_report(report: dict, show_all: bool = False) -> str:
+    """
+    Resumen en texto: una línea por entrada con problemas (o por todas con 'show_all').
+    """
+    summary = report["summary"]
+    lines = [f"{summary['total']} entradas, {summary['flagged']} con problemas "
+             f"({summary['checked']} analizadas en {summary['seconds']:.2f} s)"]
+    if summary["breach_index"] is None:
+        lines.append("Sin índice de contraseñas filtradas (python audit.py build ...).")
+    for issue, count in summary["issues"].items():
+        if count:
+            lines.append(f"  {ISSUE_LABELS[issue]}: {count}")
+    lines.append("")
+    for service, analysis in sorted(report["entries"].items()):
+        if analysis["issues"] or show_all:
+            issues = ", ".join(ISSUE_LABELS[issue] for issue in analysis["issues"]) or "sin problemas"
+            lines.append(f"{service}: {STRENGTH_LABELS[analysis['strength']]}, {analysis['entropy']:.0f} bits - {issues}")
+    for group in report["reused"]:
+        lines.append(f"Misma contraseña: {', '.join(group)}")
+    return "\n".join(lines)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="gestion-claves-audit", description="Índice de contraseñas filtradas para la auditoría.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="crear el índice a partir de una lista de hashes SHA-1 o de contraseñas")
+    build_parser.add_argument("source", help="archivo de texto o '-' para stdin")
+    build_parser.add_argument("--plain", action="store_true", help="el archivo contiene contraseñas en claro, una por línea")
+    build_parser.add_argument("--output", default=None, help=f"ruta del índice (por defecto {default_breach_index_path()})")
+    args = parser.parse_args(argv)
+
+    output = args.output or default_breach_index_path()
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    progress = lambda count: print(f"{count} líneas leídas...", file=sys.stderr)
+    try:
+        if args.source == "-":
+            total = build_breach_index(sys.stdin, output, args.plain, progress)
+        else:
+            with open(args.source, encoding="utf-8", errors="replace") as f:
+                total = build_breach_index(f, output, args.plain, progress)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Índice con {total} hashes guardado en {output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Compara la latencia de obtener un secreto con el agente de desbloqueo frente a un desbloqueo en frío.
+
+    python benchmarks/bench_agent.py [--entries 1000] [--runs 20] [--output resultados.json]
+
+Crea una bóveda temporal y un agente en un socket temporal; no toca la bóveda real.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from common import MASTER_PASSWORD, environment, make_vault, summarize, timed, write_results
+import agent
+from vault import open_vault
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--output", help="guardar los resultados en JSON")
+    args = parser.parse_args(argv)
+    if not agent.agent_supported():
+        print("Esta plataforma no admite sockets Unix.", file=sys.stderr)
+        return 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chmod(tmp, 0o700)
+        vault_path = os.path.join(tmp, "bench.vault")
+        socket_path = os.path.join(tmp, "agent", "agent.sock")
+        key = make_vault(vault_path, args.entries)
+        target = f"service-{args.entries // 2:06d}"
+
+        server = agent.UnlockAgent(socket_path, idle_timeout=600)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        while not os.path.exists(socket_path):
+            time.sleep(0.01)
+        agent.add_key(vault_path, key, socket_path)
+
+        def cold_lookup():
+            with open_vault(MASTER_PASSWORD, vault_path) as v:
+                v.get_secret(target)
+
+        def agent_lookup():
+            with open_vault(path=vault_path, key=agent.get_key(vault_path, socket_path)) as v:
+                v.get_secret(target)
+
+        results = {
+            "environment": environment(),
+            "entries": args.entries,
+            "cold_unlock_lookup": summarize(timed(cold_lookup, args.runs)),
+            "agent_lookup": summarize(timed(agent_lookup, args.runs)),
+            "agent_key_roundtrip": summarize(timed(lambda: agent.get_key(vault_path, socket_path), args.runs * 10)),
+        }
+        agent.request({"op": "stop"}, socket_path)
+        thread.join(timeout=5)
+
+    for name in ("cold_unlock_lookup", "agent_lookup", "agent_key_roundtrip"):
+        stats = results[name]
+        print(f"{name:22s} mediana {stats['median_ms']:9.3f} ms   p95 {stats['p95_ms']:9.3f} ms")
+    if args.output:
+        write_results(args.output, results)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Mide cómo escalan las operaciones de la bóveda con bóvedas sintéticas de distintos tamaños.
+
+    python benchmarks/bench_vault.py [--sizes 100,1000,10000,100000] [--runs 5] [--output resultados.json]
+    python benchmarks/bench_vault.py --baseline anterior.json    # marca regresiones respecto a otra ejecución
+    xvfb-run python benchmarks/bench_vault.py --gui             # incluye el renderizado de la lista
+
+Para cada tamaño mide: derivación de la clave, desbloqueo (clave + lectura del índice),
+carga completa (descifrar todas las entradas), construcción del índice de búsqueda,
+guardado de una sola entrada, auditoría completa e incremental (tras cambiar una entrada),
+búsqueda por pulsación de tecla (exacta y aproximada) y, con --gui, el renderizado de la lista. Trabaja sobre bóvedas temporales.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+
+from common import MASTER_PASSWORD, environment, make_vault, summarize, timed, write_results
+from audit import Auditor
+from search import SearchIndex
+from vault import derive_key, open_vault
+
+DEFAULT_SIZES = "100,1000,10000,100000"
+DEFAULT_THRESHOLD = 1.25 # A median this many times slower than the baseline counts as a regression
+
+def typing_prefixes(query: str) -> list:
+    return [query[:length] for length in range(1, len(query) + 1)]
+
+def bench_search(search_index: SearchIndex, query: str, fuzzy: bool, runs: int) -> dict:
+    """
+    Simula escribir 'query' letra a letra y mide cada búsqueda por separado.
+    """
+    samples = []
+    for _ in range(runs):
+        search_index.search("")
+        for prefix in typing_prefixes(query):
+            samples.extend(timed(lambda: search_index.search(prefix, fuzzy=fuzzy), 1))
+    return summarize(samples)
+
+def gui_renderer():
+    """
+    Devuelve una función que mide el renderizado de la lista, o un motivo si no hay pantalla disponible.
+    """
+    if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        return None, "sin DISPLAY (usa xvfb-run)"
+    try:
+        import customtkinter as ctk
+        from main import VirtualListFrame
+        root = ctk.CTk()
+    except Exception as e: # Missing GUI dependencies or no display server
+        return None, str(e)
+    root.geometry("800x600")
+    list_frame = VirtualListFrame(root, command=lambda service: None, label_text="Benchmark")
+    list_frame.pack(fill="both", expand=True)
+    root.update()
+
+    def render(services: list) -> dict:
+        # Alternate between lists whose first rows differ, so every draw relabels the visible
+        # buttons instead of hitting the unchanged-row shortcut in _render
+        variants = itertools.cycle([services, services[::-1], services[len(services) // 2:]])
+        def draw():
+            list_frame.set_items(next(variants))
+            root.update_idletasks()
+        draw() # Warm up widget creation
+        return summarize(timed(draw, 21))
+
+    return render, None
+
+def bench_size(tmp: str, entries: int, runs: int, render) -> dict:
+    path = os.path.join(tmp, f"vault-{entries}.dat")
+    key = make_vault(path, entries)
+    results = {}
+    with open_vault(path=path, key=key) as vault:
+        kdf_params = vault.kdf_params
+    results["kdf"] = summarize(timed(lambda: derive_key(MASTER_PASSWORD, kdf_params), runs))
+    results["unlock"] = summarize(timed(lambda: open_vault(MASTER_PASSWORD, path), runs))
+    results["unlock_with_key"] = summarize(timed(lambda: open_vault(path=path, key=key), runs))
+
+    vault = open_vault(path=path, key=key)
+    results["full_load"] = summarize(timed(lambda: sum(1 for _ in vault.items()), runs))
+    search_index = SearchIndex()
+    pairs = [(service, vault.get_meta(service)["username"]) for service in vault.services()]
+    results["index_build"] = summarize(timed(lambda: search_index.build(pairs), runs))
+
+    counter = iter(range(10 ** 9))
+    def save_one():
+        i = next(counter) % entries
+        vault.put(f"service-{i:06d}", {"username": f"user{i}@example.com", "password": f"changed-{i}", "notes": ""})
+        vault.flush()
+    results["single_save"] = summarize(timed(save_one, max(runs, 10)))
+
+    auditor = Auditor(breach_path="")
+    results["audit_full"] = summarize(timed(lambda: Auditor(breach_path="").audit(vault), min(runs, 3)))
+    auditor.audit(vault)
+    results["audit_incremental"] = summarize(timed(lambda: (save_one(), auditor.audit(vault)), runs))
+
+    target = f"service-{entries // 2:06d}"
+    results["search_keystroke"] = bench_search(search_index, target, False, runs)
+    results["search_keystroke_fuzzy"] = bench_search(search_index, "svc" + target[-4:], True, runs)
+    if render is not None:
+        results["list_render"] = render(search_index.search(""))
+    vault.lock()
+    return results
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Devuelve las métricas cuya mediana empeora más de 'threshold' veces respecto a 'baseline'.
+    """
+    regressions = []
+    for size, metrics in results["sizes"].items():
+        for name, stats in metrics.items():
+            previous = baseline.get("sizes", {}).get(size, {}).get(name)
+            if previous and previous["median_ms"] > 0:
+                ratio = stats["median_ms"] / previous["median_ms"]
+                if ratio > threshold:
+                    regressions.append((size, name, previous["median_ms"], stats["median_ms"], ratio))
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="tamaños de bóveda separados por comas")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--gui", action="store_true", help="medir también el renderizado de la lista (requiere pantalla o Xvfb)")
+    parser.add_argument("--output", help="guardar los resultados en JSON")
+    parser.add_argument("--baseline", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+
+    render = None
+    results = {"environment": environment(), "runs": args.runs, "sizes": {}}
+    if args.gui:
+        render, reason = gui_renderer()
+        if render is None:
+            results["list_render_skipped"] = reason
+            print(f"Renderizado de la lista omitido: {reason}", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for entries in sizes:
+            print(f"== {entries} entradas", file=sys.stderr)
+            metrics = bench_size(tmp, entries, args.runs, render)
+            results["sizes"][str(entries)] = metrics
+            for name, stats in metrics.items():
+                print(f"  {name:24s} mediana {stats['median_ms']:10.3f} ms   p95 {stats['p95_ms']:10.3f} ms", file=sys.stderr)
+
+    if args.output:
+        write_results(args.output, results)
+    else:
+        json.dump(results, sys.stdout, indent=4)
+        print()
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for size, name, before, after, ratio in regressions:
+            print(f"REGRESIÓN {size:>7s} {name:24s} {before:10.3f} -> {after:10.3f} ms (x{ratio:.2f})", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
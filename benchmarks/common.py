@@ -0,0 +1,67 @@
+"""
+Utilidades compartidas por los scripts de medición: cronometraje, resumen y bóvedas sintéticas.
+"""
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vault import open_vault
+
+MASTER_PASSWORD = "benchmark-master-password"
+
+def summarize(samples: list) -> dict:
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "p95_ms": round(samples[max(0, math.ceil(len(samples) * 0.95) - 1)] * 1000, 3), # Nearest-rank percentile
+        "min_ms": round(samples[0] * 1000, 3),
+    }
+
+def timed(func, runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def synthetic_entries(count: int):
+    for i in range(count):
+        yield f"service-{i:06d}", {"username": f"user{i}@example.com", "password": f"pw-{i:06d}-Xy!", "notes": f"nota {i}" if i % 4 == 0 else ""}
+
+def make_vault(path: str, entries: int):
+    """
+    Crea en 'path' una bóveda sintética de 'entries' entradas escrita en un solo lote.
+    """
+    with open_vault(MASTER_PASSWORD, path, create=True) as vault:
+        vault.apply_batch(synthetic_entries(entries))
+        return vault.key
+
+def environment() -> dict:
+    """
+    Datos del entorno para poder comparar resultados entre commits y máquinas.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+def write_results(path: str, results: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+        f.write("\n")
@@ -0,0 +1,298 @@
+"""
+gestion-claves: interfaz de línea de comandos para la bóveda, sin dependencias gráficas.
+
+    python cli.py list [patrón]
+    python cli.py get SERVICIO [--field password|username|notes] [--json]
+    python cli.py add SERVICIO -u USUARIO [-n NOTAS] [--force]
+    python cli.py rm SERVICIO
+    python cli.py import ARCHIVO|- [--format auto|csv|json|bitwarden|list] [--on-conflict skip|overwrite|rename]
+    python cli.py export ARCHIVO|- [--format json|csv|bitwarden]
+    python cli.py audit [--breach-index RUTA] [--workers N] [--all] [--json]
+    python cli.py generate [-n CANTIDAD] [--length N] [--classes upper,lower,digits,symbols]
+    python cli.py rotate [SERVICIO ...] [--flagged] [--length N] [--classes ...] [--show]
+    python cli.py vaults [list | add NOMBRE RUTA [--default] | rm NOMBRE | default NOMBRE]
+
+--vault acepta un nombre registrado con 'vaults add' o una ruta; sin él se usa
+$GESTION_CLAVES_VAULT, la bóveda por defecto del registro o passwords.json.enc.
+
+Si hay un agente (agent.py) con la bóveda desbloqueada se usa su clave y no se pide
+nada. Si no, la contraseña maestra se toma de la variable de entorno GESTION_CLAVES_PASSWORD,
+de la primera línea de stdin con --password-stdin o, si no, se pide por teclado;
+con --add-to-agent la clave derivada se entrega al agente para los siguientes usos.
+"""
+import argparse
+import getpass
+import json
+import os
+import sys
+import agent
+import diagnostics
+import generator
+import registry
+import transfer
+from vault import InvalidToken, open_vault
+
+# --- Constants ---
+MASTER_PASSWORD_ENV = "GESTION_CLAVES_PASSWORD"
+ENTRY_FIELDS = ("username", "password", "notes")
+
+def read_master_password(args) -> str:
+    password = os.environ.get(MASTER_PASSWORD_ENV)
+    if password:
+        return password
+    if args.password_stdin:
+        return sys.stdin.readline().rstrip("\n")
+    return getpass.getpass("Contraseña maestra: ")
+
+def unlock(args):
+    """
+    Abre la bóveda con la clave del agente si está disponible; si no, con la contraseña maestra.
+    """
+    if not args.no_agent and os.path.exists(args.vault):
+        key = agent.get_key(args.vault)
+        if key is not None:
+            try:
+                return open_vault(path=args.vault, key=key)
+            except InvalidToken:
+                pass # The agent holds a key for a different vault at this path
+    vault = open_vault(read_master_password(args), args.vault, create=getattr(args, "create", False))
+    if args.add_to_agent and not agent.add_key(args.vault, vault.key):
+        print("Aviso: no se pudo entregar la clave al agente.", file=sys.stderr)
+    return vault
+
+def open_file(path: str, mode: str):
+    if path == "-":
+        return sys.stdout if "w" in mode else sys.stdin
+    # utf-8-sig drops the BOM that spreadsheet exports put in front of CSV files
+    return open(path, mode, encoding="utf-8-sig" if "r" in mode else "utf-8", newline="")
+
+# --- Commands ---
+def cmd_list(vault, args) -> int:
+    pattern = (args.pattern or "").lower()
+    for service in sorted(vault.services(), key=str.lower):
+        if pattern in service.lower():
+            print(service)
+    return 0
+
+def cmd_get(vault, args) -> int:
+    entry = vault.get(args.service)
+    if entry is None:
+        print(f"No existe el servicio '{args.service}'.", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps({"service": args.service, **entry}, ensure_ascii=False))
+    else:
+        print(entry.get(args.field, ""))
+    return 0
+
+def cmd_add(vault, args) -> int:
+    if args.service in vault and not args.force:
+        print(f"El servicio '{args.service}' ya existe (usa --force para reemplazarlo).", file=sys.stderr)
+        return 1
+    password = args.password or getpass.getpass(f"Contraseña para '{args.service}': ")
+    if not args.username or not password:
+        print("Usuario y Contraseña no pueden estar vacíos.", file=sys.stderr)
+        return 1
+    vault.put(args.service, {"username": args.username, "password": password, "notes": args.notes})
+    return 0
+
+def cmd_rm(vault, args) -> int:
+    if args.service not in vault:
+        print(f"No existe el servicio '{args.service}'.", file=sys.stderr)
+        return 1
+    vault.delete(args.service)
+    return 0
+
+def report_progress(verb: str):
+    """
+    Devuelve un callback de progreso que escribe en stderr solo si es una terminal.
+    """
+    if not sys.stderr.isatty():
+        return None
+    return lambda count: print(f"\r{verb} {count} entradas...", end="", file=sys.stderr, flush=True)
+
+def cmd_import(vault, args) -> int:
+    on_conflict = "overwrite" if args.overwrite else args.on_conflict
+    progress = report_progress("Importando")
+    f = open_file(args.file, "r")
+    try:
+        stats = transfer.import_entries(vault, transfer.read_entries(f, args.format, args.file), on_conflict, progress)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    if progress is not None:
+        print(file=sys.stderr)
+    print(f"Importadas {stats['imported']} entradas, omitidas {stats['skipped']} repetidas.", file=sys.stderr)
+    return 0
+
+def cmd_export(vault, args) -> int:
+    progress = report_progress("Exportando") if args.file != "-" else None
+    f = open_file(args.file, "w")
+    try:
+        transfer.export_entries(vault, f, args.format, progress)
+    finally:
+        if f is not sys.stdout:
+            f.close()
+    if progress is not None:
+        print(file=sys.stderr)
+    return 0
+
+def cmd_audit(vault, args) -> int:
+    import audit # Pulls in multiprocessing, mmap...; kept off the path of every other command
+    auditor = audit.Auditor(args.breach_index, args.workers)
+    report = auditor.audit(vault, report_progress("Analizando"))
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=4))
+    else:
+        print(audit.format_report(report, args.all))
+    return 0
+
+def parse_classes(value: str) -> list:
+    classes = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in classes if name not in generator.CHAR_CLASSES]
+    if unknown or not classes:
+        raise argparse.ArgumentTypeError(f"tipos válidos: {', '.join(generator.CHAR_CLASSES)}")
+    return classes
+
+def add_policy_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--length", type=int, default=generator.DEFAULT_LENGTH)
+    parser.add_argument("--classes", type=parse_classes, default=list(generator.DEFAULT_CLASSES),
+                        help="tipos de carácter separados por comas (al menos uno de cada uno)")
+
+def cmd_generate(args) -> int:
+    for password in generator.generate_passwords(args.count, args.length, args.classes):
+        print(password)
+    return 0
+
+def cmd_rotate(vault, args) -> int:
+    services = list(args.services)
+    missing = [service for service in services if service not in vault]
+    if missing:
+        print(f"No existe el servicio '{missing[0]}'.", file=sys.stderr)
+        return 1
+    if args.flagged:
+        import audit
+        report = audit.Auditor().audit(vault)
+        services += [service for service, analysis in report["entries"].items() if analysis["issues"]]
+    progress = report_progress("Rotando")
+    rotated = generator.rotate_passwords(vault, services, args.length, args.classes, progress)
+    if progress is not None:
+        print(file=sys.stderr)
+    if args.show:
+        for service, password in rotated.items():
+            print(f"{service}\t{password}")
+    print(f"Rotadas {len(rotated)} contraseñas.", file=sys.stderr)
+    return 0
+
+def cmd_vaults(args) -> int:
+    if args.action == "add":
+        registry.add_vault(args.name, args.path, make_default=args.default)
+    elif args.action == "rm":
+        registry.remove_vault(args.name)
+    elif args.action == "default":
+        registry.set_default(args.name)
+    else:
+        default = registry.default_vault_name()
+        for name, path in sorted(registry.list_vaults().items()):
+            print(f"{'*' if name == default else ' '} {name}\t{path}")
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="gestion-claves", description="Gestor de contraseñas local (línea de comandos).")
+    parser.add_argument("--vault", default=None, help="nombre registrado o ruta de la bóveda")
+    parser.add_argument("--password-stdin", action="store_true", help="leer la contraseña maestra de la primera línea de stdin")
+    parser.add_argument("--no-agent", action="store_true", help="no usar el agente de desbloqueo")
+    parser.add_argument("--add-to-agent", action="store_true", help="entregar la clave derivada al agente tras desbloquear")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="listar servicios")
+    list_parser.add_argument("pattern", nargs="?", help="filtrar por texto contenido en el nombre")
+    list_parser.set_defaults(func=cmd_list)
+
+    get_parser = commands.add_parser("get", help="mostrar un campo de una entrada")
+    get_parser.add_argument("service")
+    get_parser.add_argument("--field", choices=ENTRY_FIELDS, default="password")
+    get_parser.add_argument("--json", action="store_true", help="mostrar la entrada completa en JSON")
+    get_parser.set_defaults(func=cmd_get)
+
+    add_parser = commands.add_parser("add", help="añadir o reemplazar una entrada")
+    add_parser.add_argument("service")
+    add_parser.add_argument("-u", "--username", required=True)
+    add_parser.add_argument("-p", "--password", help="si se omite se pide por teclado")
+    add_parser.add_argument("-n", "--notes", default="")
+    add_parser.add_argument("--force", action="store_true", help="reemplazar si ya existe")
+    add_parser.set_defaults(func=cmd_add, create=True)
+
+    rm_parser = commands.add_parser("rm", help="eliminar una entrada")
+    rm_parser.add_argument("service")
+    rm_parser.set_defaults(func=cmd_rm)
+
+    import_parser = commands.add_parser("import", help="importar entradas desde CSV o JSON (propio, Bitwarden o lista)")
+    import_parser.add_argument("file", help="archivo o '-' para stdin")
+    import_parser.add_argument("--format", choices=transfer.FORMATS, default="auto")
+    import_parser.add_argument("--on-conflict", choices=transfer.CONFLICT_POLICIES, default="skip", help="qué hacer con servicios repetidos")
+    import_parser.add_argument("--overwrite", action="store_true", help="equivale a --on-conflict overwrite")
+    import_parser.set_defaults(func=cmd_import, create=True)
+
+    export_parser = commands.add_parser("export", help="exportar todas las entradas en claro")
+    export_parser.add_argument("file", help="archivo o '-' para stdout")
+    export_parser.add_argument("--format", choices=transfer.EXPORT_FORMATS, default="json")
+    export_parser.set_defaults(func=cmd_export)
+
+    audit_parser = commands.add_parser("audit", help="revisar contraseñas débiles, repetidas o filtradas")
+    audit_parser.add_argument("--breach-index", default=None, help="índice de contraseñas filtradas (ver 'python audit.py build')")
+    audit_parser.add_argument("--workers", type=int, default=None, help="procesos para bóvedas grandes (por defecto, uno por CPU)")
+    audit_parser.add_argument("--all", action="store_true", help="mostrar también las entradas sin problemas")
+    audit_parser.add_argument("--json", action="store_true", help="informe completo en JSON")
+    audit_parser.set_defaults(func=cmd_audit)
+
+    generate_parser = commands.add_parser("generate", help="generar contraseñas sin tocar la bóveda")
+    generate_parser.add_argument("-n", "--count", type=int, default=1)
+    add_policy_arguments(generate_parser)
+    generate_parser.set_defaults(func=cmd_generate, needs_vault=False)
+
+    rotate_parser = commands.add_parser("rotate", help="cambiar por contraseñas generadas, en una sola escritura")
+    rotate_parser.add_argument("services", nargs="*", metavar="service")
+    rotate_parser.add_argument("--flagged", action="store_true", help="incluir todas las entradas con problemas según 'audit'")
+    rotate_parser.add_argument("--show", action="store_true", help="mostrar las contraseñas nuevas")
+    add_policy_arguments(rotate_parser)
+    rotate_parser.set_defaults(func=cmd_rotate)
+
+    vaults_parser = commands.add_parser("vaults", help="gestionar las bóvedas con nombre")
+    vault_actions = vaults_parser.add_subparsers(dest="action")
+    vault_actions.add_parser("list", help="listar las bóvedas registradas (* = por defecto)")
+    vault_add = vault_actions.add_parser("add", help="registrar una bóveda (se crea al usarla por primera vez)")
+    vault_add.add_argument("name")
+    vault_add.add_argument("path")
+    vault_add.add_argument("--default", action="store_true", help="usarla por defecto")
+    vault_actions.add_parser("rm", help="olvidar un nombre (no borra el archivo)").add_argument("name")
+    vault_actions.add_parser("default", help="elegir la bóveda por defecto").add_argument("name")
+    vaults_parser.set_defaults(func=cmd_vaults, needs_vault=False)
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if not getattr(args, "needs_vault", True):
+        try:
+            return args.func(args)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+    args.vault = registry.resolve_vault(args.vault)
+    diagnostics.install_profiler()
+    try:
+        with unlock(args) as vault:
+            return args.func(vault, args)
+    except InvalidToken:
+        print("Contraseña maestra incorrecta.", file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+    finally:
+        if diagnostics.ENABLED:
+            print(diagnostics.report(), file=sys.stderr)
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
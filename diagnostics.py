@@ -0,0 +1,183 @@
+"""
+Instrumentación ligera de las rutas críticas (KDF, cifrado, JSON, E/S y refresco de la lista).
+
+Se activa con la variable de entorno GESTION_CLAVES_DIAG=1. Desactivada, @timed devuelve la
+función original sin envolver y timer() un contexto vacío compartido, así que el coste es
+prácticamente nulo. Activada, cada métrica acumula número de llamadas, tiempo total, máximo
+e histograma en potencias de dos de microsegundos; add() lleva contadores simples (bytes, registros).
+
+Con GESTION_CLAVES_PROFILE=ruta.prof además se perfila con cProfile el hilo principal y los
+hilos que llamen a profile_current_thread(), y el perfil se vuelca en esa ruta al salir
+(se lee con: python -m pstats ruta.prof).
+"""
+import atexit
+import contextlib
+import functools
+import os
+import threading
+import time
+
+# --- Constants ---
+DIAGNOSTICS_ENV = "GESTION_CLAVES_DIAG"
+PROFILE_ENV = "GESTION_CLAVES_PROFILE"
+ENABLED = os.environ.get(DIAGNOSTICS_ENV, "") not in ("", "0")
+PROFILE_PATH = os.environ.get(PROFILE_ENV) or None
+
+_NULL_TIMER = contextlib.nullcontext()
+_lock = threading.Lock()
+_metrics = {}
+_counters = {}
+_profiles = []
+
+class Metric:
+    """
+    Tiempos de una operación: llamadas, total, máximo e histograma (cubeta i = hasta 2**i µs).
+    """
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = {}
+
+    def record(self, seconds: float):
+        bucket = int(seconds * 1e6).bit_length()
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Cota superior (en segundos) del percentil según el histograma.
+        """
+        target = self.count * fraction
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= target:
+                return min((1 << bucket) / 1e6, self.max)
+        return self.max
+
+def record(name: str, seconds: float):
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = Metric()
+        metric.record(seconds)
+
+def add(name: str, amount: int = 1):
+    if ENABLED:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + amount
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, time.perf_counter() - self.start)
+
+def timer(name: str):
+    """
+    Contexto que mide el bloque con el nombre 'name' (no hace nada si está desactivado).
+    """
+    return _Timer(name) if ENABLED else _NULL_TIMER
+
+def timed(name: str):
+    """
+    Decorador equivalente a timer(); desactivado devuelve la función tal cual.
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def snapshot() -> dict:
+    """
+    Copia de las métricas en milisegundos, apta para JSON.
+    """
+    with _lock:
+        timings = {
+            name: {
+                "count": metric.count,
+                "total_ms": round(metric.total * 1000, 3),
+                "mean_ms": round(metric.total / metric.count * 1000, 3),
+                "p50_ms": round(metric.percentile(0.5) * 1000, 3),
+                "p95_ms": round(metric.percentile(0.95) * 1000, 3),
+                "max_ms": round(metric.max * 1000, 3),
+                "histogram_us": {f"<={1 << bucket}": hits for bucket, hits in sorted(metric.buckets.items())},
+            }
+            for name, metric in _metrics.items()
+        }
+        return {"enabled": ENABLED, "timings": timings, "counters": dict(_counters)}
+
+def report() -> str:
+    """
+    Resumen en texto de las métricas, ordenado por tiempo total.
+    """
+    data = snapshot()
+    if not data["enabled"]:
+        return f"Diagnóstico desactivado. Inicia la aplicación con {DIAGNOSTICS_ENV}=1 para medir."
+    lines = [f"{'métrica':26s} {'llamadas':>9s} {'total ms':>10s} {'media ms':>9s} {'p95 ms':>9s} {'máx ms':>9s}"]
+    for name, stats in sorted(data["timings"].items(), key=lambda item: -item[1]["total_ms"]):
+        lines.append(f"{name:26s} {stats['count']:9d} {stats['total_ms']:10.2f} {stats['mean_ms']:9.3f} {stats['p95_ms']:9.3f} {stats['max_ms']:9.3f}")
+    if data["counters"]:
+        lines.append("")
+        lines.extend(f"{name:26s} {value:9d}" for name, value in sorted(data["counters"].items()))
+    return "\n".join(lines)
+
+def reset():
+    with _lock:
+        _metrics.clear()
+        _counters.clear()
+
+# --- Profiling ---
+def profile_current_thread():
+    """
+    Perfila el hilo actual si se pidió un perfil; pensado como 'initializer' de los ThreadPoolExecutor.
+    """
+    if PROFILE_PATH is None:
+        return
+    import cProfile # Only paid for when profiling was requested
+    profile = cProfile.Profile()
+    profile.enable()
+    with _lock:
+        _profiles.append(profile)
+
+def dump_profile(path: str = None) -> bool:
+    """
+    Vuelca en 'path' (o en GESTION_CLAVES_PROFILE) el perfil acumulado de todos los hilos perfilados.
+    """
+    path = path or PROFILE_PATH
+    with _lock:
+        profiles = list(_profiles)
+    if not path or not profiles:
+        return False
+    import pstats
+    pstats.Stats(*profiles).dump_stats(path)
+    return True
+
+def install_profiler():
+    """
+    Empieza a perfilar el hilo principal y programa el volcado al salir, si GESTION_CLAVES_PROFILE está definida.
+    """
+    if PROFILE_PATH is not None and not _profiles:
+        profile_current_thread()
+        atexit.register(dump_profile)
@@ -0,0 +1,78 @@
+"""
+Generación de contraseñas por lotes y rotación de entradas.
+
+generate_passwords() crea N contraseñas que cumplen la política (longitud y tipos de
+carácter, con al menos uno de cada tipo elegido) a partir de un único bloque de
+secrets.token_bytes. Los bytes se convierten en caracteres con muestreo por rechazo
+sin sesgo: solo se aceptan los bytes menores que el mayor múltiplo del tamaño del
+alfabeto, y el filtrado y la conversión se hacen de una vez con bytes.translate.
+Las contraseñas sin algún tipo de carácter se descartan enteras, así que todas las
+que cumplen la política son igual de probables.
+"""
+import secrets
+import string
+
+# --- Constants ---
+CHAR_CLASSES = {
+    "upper": string.ascii_uppercase,
+    "lower": string.ascii_lowercase,
+    "digits": string.digits,
+    "symbols": string.punctuation,
+}
+DEFAULT_CLASSES = ("upper", "lower", "digits", "symbols")
+DEFAULT_LENGTH = 16
+BUFFER_MARGIN = 1.25 # Extra random bytes drawn to cover rejected bytes and non-compliant passwords
+
+def _translation(alphabet: str) -> tuple:
+    """
+    Tabla de bytes -> caracteres y bytes a descartar para un muestreo uniforme sobre 'alphabet'.
+    """
+    size = len(alphabet)
+    limit = 256 - 256 % size # Bytes at or above this would favour the first characters
+    table = bytes(ord(alphabet[byte % size]) if byte < limit else 0 for byte in range(256))
+    return table, bytes(range(limit, 256)), limit / 256
+
+def generate_passwords(count: int, length: int = DEFAULT_LENGTH, classes=DEFAULT_CLASSES) -> list:
+    """
+    Devuelve 'count' contraseñas de 'length' caracteres con al menos uno de cada tipo de 'classes'.
+    """
+    classes = [name for name in CHAR_CLASSES if name in classes]
+    if not classes:
+        raise ValueError("Selecciona al menos un tipo de carácter")
+    if length < len(classes):
+        raise ValueError(f"La longitud mínima para {len(classes)} tipos de carácter es {len(classes)}")
+    alphabet = "".join(CHAR_CLASSES[name] for name in classes)
+    class_sets = [frozenset(CHAR_CLASSES[name]) for name in classes]
+    table, rejected, acceptance = _translation(alphabet)
+
+    passwords = []
+    while len(passwords) < count:
+        missing = count - len(passwords)
+        buffer = secrets.token_bytes(int(missing * length / acceptance * BUFFER_MARGIN) + length)
+        characters = buffer.translate(table, rejected).decode("ascii")
+        for start in range(0, len(characters) - length + 1, length):
+            password = characters[start:start + length]
+            chars = set(password)
+            if all(not chars.isdisjoint(class_set) for class_set in class_sets):
+                passwords.append(password)
+                if len(passwords) == count:
+                    break
+    return passwords
+
+def generate_password(length: int = DEFAULT_LENGTH, classes=DEFAULT_CLASSES) -> str:
+    return generate_passwords(1, length, classes)[0]
+
+def rotate_passwords(vault, services, length: int = DEFAULT_LENGTH, classes=DEFAULT_CLASSES, progress=None) -> dict:
+    """
+    Asigna una contraseña nueva a cada servicio de 'services' (conservando usuario y notas)
+    y lo guarda todo con una sola escritura de la bóveda. Devuelve {servicio: contraseña nueva}.
+    """
+    services = [service for service in dict.fromkeys(services) if service in vault]
+    new_passwords = dict(zip(services, generate_passwords(len(services), length, classes)))
+    rotated = {}
+    def changes():
+        for service, data in vault.items(services=services):
+            rotated[service] = new_passwords[service]
+            yield service, {**data, "password": rotated[service]}
+    vault.apply_batch(changes(), progress)
+    return rotated
@@ -1,13 +1,67 @@
 import customtkinter as ctk
 from PIL import Image
-import os
-import json
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.backends import default_backend
-import base64
-import CTkMessagebox
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import filedialog
+from search import SearchIndex
+import agent
+import diagnostics
+import generator
+import registry
+import transfer
+from diagnostics import timed
+
+# --- Constants ---
+SECRET_CACHE_PURGE_MS = 30000 # How often expired secrets are dropped from memory
+LIST_ROW_HEIGHT = 38 # Fixed row height lets the list compute which rows are visible
+SEARCH_DEBOUNCE_MS = 120 # Keystrokes closer together than this are coalesced into one search
+SEARCH_POLL_MS = 15
+BACKGROUND_POLL_MS = 30
+SAVE_DEBOUNCE_MS = 400 # Edits within this window are written to disk together
+TRANSFER_PROGRESS_MS = 100
+DIAGNOSTICS_REFRESH_MS = 1000
+VAULT_POLL_MS = 2000 # How often the open vault is checked for changes written by other instances
+ICON_SIZE = (24, 24)
+ICON_NAMES = ("Navigation", "Add", "Password", "Edit", "Delete", "Settings")
+
+# --- Deferred Imports / Shared Resources ---
+# CTkMessagebox and cryptography (through vault) are imported on first use or warmed up on the
+# vault thread once the login screen is painted, so they do not delay the first window. PIL is not
+# deferred: customtkinter already imports it; only decoding the icon files is moved off the start-up path.
+_icon_images = {} # name -> decoded PIL image, shared by the whole process
+_icons = {} # (name, size) -> CTkImage
+
+def load_icon_images(names=ICON_NAMES):
+    """
+    Decodifica los PNG de 'icons/' una sola vez por proceso. Puede llamarse desde un hilo de fondo.
+    """
+    for name in names:
+        if name not in _icon_images:
+            image = Image.open(f"icons/{name}.png")
+            image.load()
+            _icon_images[name] = image
+
+def get_icon(name: str, size=ICON_SIZE) -> ctk.CTkImage:
+    """
+    CTkImage compartida del icono 'name'; todas las pantallas reutilizan la misma instancia.
+    """
+    icon = _icons.get((name, size))
+    if icon is None:
+        load_icon_images((name,))
+        icon = _icons[(name, size)] = ctk.CTkImage(_icon_images[name], size=size)
+    return icon
+
+def message_box(**kwargs):
+    from CTkMessagebox import CTkMessagebox
+    return CTkMessagebox(**kwargs)
+
+def preload_resources():
+    """
+    Importa los módulos pesados y decodifica los iconos en segundo plano mientras el usuario escribe la contraseña.
+    """
+    # Imported only to warm sys.modules; the later imports on the Tk thread are then free
+    import vault
+    import CTkMessagebox
+    load_icon_images()
 
 # --- Standalone Closing Handler ---
 def handle_app_closing(app_instance):
@@ -20,18 +74,30 @@ def handle_app_closing(app_instance):
     app_instance.is_closing = True
 
     if app_instance.is_logged_in:
-        app_instance.is_logged_in = False
-        if app_instance.main_app_frame and app_instance.main_app_frame.winfo_exists():
-            app_instance.main_app_frame.destroy()
-        app_instance.main_app_frame = None
-        app_instance.is_closing = False # Reset flag for next time
-        app_instance.show_login_frame()
+        # Pending edits are written on the vault thread; the session is only locked once they are on disk
+        app_instance.flush_pending_writes(on_done=lambda: finish_locking(app_instance))
     else:
         app_instance.quit()
 
-# --- Constants ---
-DATA_FILE = "passwords.json.enc"
-MASTER_PASSWORD_SALT_FILE = "salt.bin"
+def finish_locking(app_instance):
+    if app_instance.vault.has_pending_writes():
+        # Edited while the previous flush was running; write that too before locking
+        app_instance.flush_pending_writes(on_done=lambda: finish_locking(app_instance))
+        return
+    app_instance.is_logged_in = False
+    if app_instance.main_app_frame and app_instance.main_app_frame.winfo_exists():
+        # Hidden and emptied rather than destroyed, so the next unlock reuses its widgets
+        app_instance.main_app_frame.on_lock()
+        app_instance.main_app_frame.grid_remove()
+    app_instance.vault.lock()
+    if app_instance.agent_session:
+        agent.forget_key(app_instance.vault_path) # Locking the window locks this vault for the agent's clients too
+        app_instance.agent_session = False
+    app_instance.vault = None
+    app_instance.search_index = None
+    app_instance.auditor = None
+    app_instance.is_closing = False # Reset flag for next time
+    app_instance.show_login_frame()
 
 class App(ctk.CTk):
     """
@@ -39,83 +105,142 @@ class App(ctk.CTk):
     """
     def __init__(self):
         super().__init__()
-        self.title("Gestor de Contraseñas")
         self.geometry("800x600")
         self.grid_rowconfigure(0, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
-        self.master_password = None
-        self.fernet = None
-        self.passwords = {}
+        self.vault_name = None
+        self.vault_path = None
+        self.select_vault(registry.default_vault_name())
+        self.vault = None
+        self.search_index = None
+        self.auditor = None # Created on the first audit; keeps per-entry results until lock
+        self.agent_session = False # The agent holds this vault's key because of this session
         self.is_logged_in = False
         self.is_closing = False
         self.main_app_frame = None
         self.login_frame = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vault", initializer=diagnostics.profile_current_thread)
+        self._save_after_id = None
 
         self.protocol("WM_DELETE_WINDOW", lambda: handle_app_closing(self))
+        self.bind("<Control-Shift-D>", lambda event: DiagnosticsDialog(self)) # Hidden diagnostics view
         self.show_login_frame()
+        self.after_idle(lambda: self.run_in_background(preload_resources))
+
+    def select_vault(self, name: str = None):
+        """
+        Elige la bóveda a desbloquear: un nombre registrado o, sin él, la resuelta por defecto.
+        """
+        self.vault_name = name
+        self.vault_path = registry.resolve_vault(name)
+        self.title(f"Gestor de Contraseñas - {name}" if name else "Gestor de Contraseñas")
 
     def show_login_frame(self):
         self.login_frame = LoginFrame(master=self, on_login_success=self.on_login_success)
         self.login_frame.grid(row=0, column=0, sticky="nsew")
 
-    def on_login_success(self, master_password: str):
+    def on_login_success(self, vault, search_index: SearchIndex):
         self.is_logged_in = True
-        self.master_password = master_password
-        self.fernet = self.derive_fernet_key(master_password)
-        self.load_passwords()
+        self.vault = vault
+        self.search_index = search_index
         if self.login_frame and self.login_frame.winfo_exists():
             self.login_frame.destroy()
         self.login_frame = None
         self.show_main_app_frame()
 
     def show_main_app_frame(self):
-        self.main_app_frame = MainAppFrame(master=self)
+        if self.main_app_frame is None:
+            self.main_app_frame = MainAppFrame(master=self)
+        else:
+            self.main_app_frame.on_unlock()
         self.main_app_frame.grid(row=0, column=0, sticky="nsew")
 
-    def get_salt(self) -> bytes:
-        if os.path.exists(MASTER_PASSWORD_SALT_FILE):
-            with open(MASTER_PASSWORD_SALT_FILE, "rb") as f:
-                salt = f.read()
-        else:
-            salt = os.urandom(16)
-            with open(MASTER_PASSWORD_SALT_FILE, "wb") as f:
-                f.write(salt)
-        return salt
-
-    def derive_fernet_key(self, master_password: str) -> Fernet:
-        salt = self.get_salt()
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-            backend=default_backend()
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(master_password.encode()))
-        return Fernet(key)
-
-    def load_passwords(self):
-        if os.path.exists(DATA_FILE):
-            try:
-                with open(DATA_FILE, "rb") as f:
-                    encrypted_data = f.read()
-                decrypted_data = self.fernet.decrypt(encrypted_data).decode()
-                self.passwords = json.loads(decrypted_data)
-            except Exception as e:
-                print(f"Error loading or decrypting data: {e}")
-                self.passwords = {}
-        else:
-            self.passwords = {}
+    def run_in_background(self, func, on_done=None, on_error=None):
+        """
+        Ejecuta 'func' en el hilo de la bóveda y entrega el resultado en el hilo de Tk.
+        Todas las operaciones de la bóveda pasan por el mismo hilo, por lo que se ejecutan en orden.
+        """
+        future = self.executor.submit(func)
+        self.after(BACKGROUND_POLL_MS, lambda: self._poll_background(future, on_done, on_error))
+
+    def _poll_background(self, future, on_done, on_error):
+        if not future.done():
+            self.after(BACKGROUND_POLL_MS, lambda: self._poll_background(future, on_done, on_error))
+            return
+        error = future.exception()
+        if error is not None:
+            if on_error:
+                on_error(error)
+        elif on_done:
+            on_done(future.result())
+
+    @timed("app.unlock")
+    def unlock(self, master_password: str = None, key: bytes = None, share_with_agent: bool = False):
+        """
+        Deriva la clave una única vez (o usa la del agente), abre (o crea) la bóveda y construye el índice de búsqueda.
+        Con 'share_with_agent' entrega la clave al agente en ejecución, como --add-to-agent en la CLI.
+        Pensado para ejecutarse en segundo plano; lanza InvalidToken si la contraseña es incorrecta.
+        """
+        from vault import open_vault
+        vault = open_vault(master_password, self.vault_path, create=True, key=key)
+        if key is None and share_with_agent:
+            share_with_agent = agent.add_key(self.vault_path, vault.key)
+        self.agent_session = key is not None or share_with_agent
+        search_index = SearchIndex()
+        search_index.build((service, vault.get_meta(service).get("username", "")) for service in vault.services())
+        return vault, search_index
+
+    def save_entry(self, service: str, data: dict):
+        self.vault.put(service, data)
+        self.schedule_save()
 
-    def save_passwords(self):
-        try:
-            json_data = json.dumps(self.passwords, indent=4)
-            encrypted_data = self.fernet.encrypt(json_data.encode())
-            with open(DATA_FILE, "wb") as f:
-                f.write(encrypted_data)
-        except Exception as e:
-            print(f"Error saving or encrypting data: {e}")
+    def delete_entry(self, service: str):
+        self.vault.delete(service)
+        self.schedule_save()
+
+    def schedule_save(self):
+        """
+        Programa una escritura en segundo plano; las ediciones seguidas se agrupan en una sola.
+        """
+        if self._save_after_id is None:
+            self._save_after_id = self.after(SAVE_DEBOUNCE_MS, self._save_in_background)
+
+    def _save_in_background(self):
+        self._save_after_id = None
+        if self.vault is None:
+            return
+        if self.main_app_frame:
+            self.main_app_frame.set_status("Guardando...", busy=True)
+        self.run_in_background(self.vault.flush, on_done=self._on_save_done, on_error=self._on_save_error)
+
+    def _on_save_done(self, result):
+        if self.main_app_frame:
+            self.main_app_frame.set_status("Cambios guardados")
+
+    def _on_save_error(self, error: Exception):
+        # Unsaved changes stay queued in the vault and are retried on the next save or on lock
+        if self.main_app_frame:
+            self.main_app_frame.set_status(f"Error al guardar: {error}", error=True)
+        message_box(title="Error", message=f"No se pudieron guardar los cambios: {error}", icon="cancel")
+
+    def flush_pending_writes(self, on_done):
+        """
+        Guarda los cambios pendientes en el hilo de la bóveda (al bloquear) y llama a 'on_done' al terminar.
+        Si no se pueden guardar, avisa y la sesión sigue abierta para no perderlos.
+        """
+        if self._save_after_id is not None:
+            self.after_cancel(self._save_after_id)
+            self._save_after_id = None
+        if self.main_app_frame:
+            self.main_app_frame.set_status("Guardando cambios antes de bloquear...", busy=True)
+        self.run_in_background(self.vault.flush, on_done=lambda _: on_done(), on_error=self._on_lock_flush_error)
+
+    def _on_lock_flush_error(self, error: Exception):
+        self.is_closing = False
+        if self.main_app_frame:
+            self.main_app_frame.set_status(f"Error al guardar: {error}", error=True)
+        message_box(title="Error", message=f"No se pudieron guardar los cambios; la sesión sigue abierta: {error}", icon="cancel")
 
 class LoginFrame(ctk.CTkFrame):
     """
@@ -124,7 +249,7 @@ class LoginFrame(ctk.CTkFrame):
     def __init__(self, master, on_login_success):
         super().__init__(master)
         self.on_login_success = on_login_success
-        self.grid_rowconfigure((0, 1, 2, 3), weight=1)
+        self.grid_rowconfigure((0, 1, 2, 3, 4), weight=1)
         self.grid_columnconfigure(0, weight=1)
         self.label = ctk.CTkLabel(self, text="Ingrese Contraseña Maestra", font=ctk.CTkFont(size=20, weight="bold"))
         self.label.grid(row=0, column=0, pady=20)
@@ -135,27 +260,184 @@ class LoginFrame(ctk.CTkFrame):
         self.login_button.grid(row=2, column=0, pady=10)
         self.error_label = ctk.CTkLabel(self, text="", text_color="red")
         self.error_label.grid(row=3, column=0)
+        self.progress_bar = ctk.CTkProgressBar(self, mode="indeterminate", width=200)
+        self.agent_button = ctk.CTkButton(self, text="Usar sesión del agente", fg_color="transparent", border_width=1, command=self.agent_login_event)
+        self.share_agent_var = ctk.BooleanVar(value=False)
+        if agent.agent_supported():
+            ctk.CTkCheckBox(self, text="Compartir la sesión con el agente", variable=self.share_agent_var).grid(row=7, column=0, pady=(0, 20))
+        self.agent_key = None
+        self.is_unlocking = False
+        vault_names = sorted(registry.list_vaults())
+        if vault_names:
+            self.vault_menu = ctk.CTkOptionMenu(self, values=vault_names, command=self._on_vault_selected, width=200)
+            self.vault_menu.set(self.master.vault_name or vault_names[0])
+            self.vault_menu.grid(row=6, column=0, pady=(0, 20))
+            if self.master.vault_name is None:
+                self.master.select_vault(vault_names[0])
+        self.after_idle(self._check_agent)
+
+    def _on_vault_selected(self, name: str):
+        self.master.select_vault(name)
+        self.agent_key = None
+        self.agent_button.grid_remove()
+        self._check_agent()
+
+    def _check_agent(self):
+        if agent.agent_supported():
+            vault_path = self.master.vault_path
+            self.master.run_in_background(lambda: agent.get_key(vault_path), on_done=lambda key: self._on_agent_key(key, vault_path))
+
+    def _on_agent_key(self, key, vault_path: str):
+        # Ignore answers for a vault that is no longer selected
+        if key is not None and self.winfo_exists() and not self.is_unlocking and vault_path == self.master.vault_path:
+            self.agent_key = key
+            self.agent_button.grid(row=5, column=0, pady=(0, 20))
 
     def login_event(self, event=None):
+        if self.is_unlocking:
+            return
         master_password = self.password_entry.get()
         if not master_password:
             self.error_label.configure(text="La contraseña no puede estar vacía.")
             return
-        if not os.path.exists(DATA_FILE) and not os.path.exists(MASTER_PASSWORD_SALT_FILE):
-            try:
-                self.master.on_login_success(master_password)
-                self.master.save_passwords()
-            except Exception as e:
-                self.error_label.configure(text=f"Error al establecer contraseña: {e}")
+        share_with_agent = self.share_agent_var.get()
+        self.set_busy(True)
+        self.master.run_in_background(lambda: self.master.unlock(master_password, share_with_agent=share_with_agent), on_done=self._on_unlocked, on_error=self._on_unlock_error)
+
+    def agent_login_event(self):
+        if self.is_unlocking or self.agent_key is None:
             return
-        try:
-            fernet_test = self.master.derive_fernet_key(master_password)
-            with open(DATA_FILE, "rb") as f:
-                encrypted_data = f.read()
-            fernet_test.decrypt(encrypted_data)
-            self.on_login_success(master_password)
-        except Exception:
+        key = self.agent_key
+        self.set_busy(True)
+        self.master.run_in_background(lambda: self.master.unlock(key=key), on_done=self._on_unlocked, on_error=self._on_agent_error)
+
+    def _on_agent_error(self, error: Exception):
+        from vault import InvalidToken
+        # The agent's key no longer opens this vault; fall back to the master password
+        self.agent_key = None
+        self.agent_button.grid_remove()
+        self._on_unlock_error(error if not isinstance(error, InvalidToken) else Exception("la sesión del agente ya no es válida."))
+
+    def set_busy(self, busy: bool):
+        self.is_unlocking = busy
+        state = "disabled" if busy else "normal"
+        self.password_entry.configure(state=state)
+        self.login_button.configure(state=state)
+        self.agent_button.configure(state=state)
+        if busy:
+            self.error_label.configure(text="Desbloqueando...", text_color=("gray10", "gray90"))
+            self.progress_bar.grid(row=4, column=0, pady=10)
+            self.progress_bar.start()
+        else:
+            self.progress_bar.stop()
+            self.progress_bar.grid_remove()
+            self.error_label.configure(text="", text_color="red")
+
+    def _on_unlocked(self, result):
+        vault, search_index = result
+        self.set_busy(False)
+        self.on_login_success(vault, search_index)
+
+    def _on_unlock_error(self, error: Exception):
+        from vault import InvalidToken
+        self.set_busy(False)
+        if isinstance(error, InvalidToken):
             self.error_label.configure(text="Contraseña maestra incorrecta.")
+        else:
+            self.error_label.configure(text=f"Error al abrir la bóveda: {error}")
+
+class VirtualListFrame(ctk.CTkFrame):
+    """
+    Lista virtualizada de servicios: solo crea botones para las filas visibles
+    y los reutiliza al desplazarse, en lugar de un botón por entrada.
+    """
+    def __init__(self, master, command, label_text: str = "", row_height: int = LIST_ROW_HEIGHT):
+        super().__init__(master)
+        self.command = command
+        self.row_height = row_height
+        self.items = []
+        self.first_index = 0
+        self.visible_rows = 0
+        self.row_buttons = []
+        self.row_texts = []
+        self.grid_rowconfigure(1, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.label = ctk.CTkLabel(self, text=label_text, corner_radius=6, fg_color=ctk.ThemeManager.theme["CTkScrollableFrame"]["label_fg_color"])
+        self.label.grid(row=0, column=0, columnspan=2, padx=5, pady=(5, 0), sticky="ew")
+        self.rows_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.rows_frame.grid(row=1, column=0, sticky="nsew")
+        self.rows_frame.grid_columnconfigure(0, weight=1)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, padx=(0, 3), pady=3, sticky="ns")
+
+        self.rows_frame.bind("<Configure>", self._on_resize)
+        self._bind_mousewheel(self.rows_frame)
+
+    def set_items(self, items: list):
+        """
+        Sustituye las filas a mostrar; los botones existentes se reutilizan.
+        """
+        self.items = items
+        self.first_index = max(0, min(self.first_index, len(items) - self.visible_rows))
+        self._render()
+
+    def scroll_to(self, index: int):
+        self.first_index = max(0, min(index, len(self.items) - self.visible_rows))
+        self._render()
+
+    def _bind_mousewheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_mousewheel)
+        widget.bind("<Button-4>", lambda event: self.scroll_to(self.first_index - 3))
+        widget.bind("<Button-5>", lambda event: self.scroll_to(self.first_index + 3))
+
+    def _on_mousewheel(self, event):
+        steps = -event.delta // 120 if abs(event.delta) >= 120 else -event.delta
+        self.scroll_to(self.first_index + steps * 3)
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(value) * len(self.items)))
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll_to(self.first_index + int(value) * step)
+
+    def _on_resize(self, event):
+        visible_rows = max(1, event.height // self.row_height)
+        if visible_rows == self.visible_rows:
+            return
+        self.visible_rows = visible_rows
+        while len(self.row_buttons) < visible_rows:
+            slot = len(self.row_buttons)
+            button = ctk.CTkButton(self.rows_frame, text="", height=self.row_height - 10, command=lambda slot=slot: self._on_click(slot))
+            self._bind_mousewheel(button)
+            self.row_buttons.append(button)
+            self.row_texts.append(None)
+        self.set_items(self.items)
+
+    def _on_click(self, slot: int):
+        index = self.first_index + slot
+        if index < len(self.items):
+            self.command(self.items[index])
+
+    @timed("ui.list_render")
+    def _render(self):
+        for slot, button in enumerate(self.row_buttons):
+            index = self.first_index + slot
+            if slot < self.visible_rows and index < len(self.items):
+                text = self.items[index]
+                if self.row_texts[slot] != text:
+                    button.configure(text=text)
+                    self.row_texts[slot] = text
+                if not button.winfo_ismapped():
+                    button.grid(row=slot, column=0, padx=5, pady=5, sticky="ew")
+            elif self.row_texts[slot] is not None:
+                button.grid_remove()
+                self.row_texts[slot] = None
+        if self.items:
+            self.scrollbar.set(self.first_index / len(self.items), min(1.0, (self.first_index + self.visible_rows) / len(self.items)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
 
 class MainAppFrame(ctk.CTkFrame):
     """
@@ -167,13 +449,13 @@ class MainAppFrame(ctk.CTkFrame):
         self.grid_columnconfigure(1, weight=1)
         self.current_selected_entry = None
 
-        # Load Icons
-        icon_size = (24, 24)
-        self.nav_icon = ctk.CTkImage(Image.open("icons/Navigation.png"), size=icon_size)
-        self.add_icon = ctk.CTkImage(Image.open("icons/Add.png"), size=icon_size)
-        self.password_icon = ctk.CTkImage(Image.open("icons/Password.png"), size=icon_size)
-        self.edit_icon = ctk.CTkImage(Image.open("icons/Edit.png"), size=icon_size)
-        self.delete_icon = ctk.CTkImage(Image.open("icons/Delete.png"), size=icon_size)
+        # Icons (shared process-wide cache)
+        self.nav_icon = get_icon("Navigation")
+        self.add_icon = get_icon("Add")
+        self.password_icon = get_icon("Password")
+        self.edit_icon = get_icon("Edit")
+        self.delete_icon = get_icon("Delete")
+        self.settings_icon = get_icon("Settings")
 
         # Sidebar
         self.sidebar_frame = ctk.CTkFrame(self, width=80, corner_radius=0)
@@ -196,14 +478,31 @@ class MainAppFrame(ctk.CTkFrame):
         self.delete_button = ctk.CTkButton(self.sidebar_frame, text="", image=self.delete_icon, width=button_width, command=self.delete_selected_entry, state="disabled")
         self.delete_button.grid(row=4, column=0, padx=20, pady=10)
 
+        self.transfer_button = ctk.CTkButton(self.sidebar_frame, text="", image=self.settings_icon, width=button_width, command=self.show_transfer_dialog)
+        self.transfer_button.grid(row=6, column=0, padx=20, pady=20)
+
+        self.audit_button = ctk.CTkButton(self.sidebar_frame, text="Auditar", width=button_width, command=self.show_audit_dialog)
+        self.audit_button.grid(row=7, column=0, padx=20, pady=(0, 20))
+
         # Main Content
-        self.search_entry = ctk.CTkEntry(self, placeholder_text="Buscar servicio...")
-        self.search_entry.grid(row=0, column=1, padx=(20, 0), pady=(20, 0), sticky="new")
-        self.search_entry.bind("<KeyRelease>", lambda event: self.refresh_password_list())
+        self.search_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.search_frame.grid(row=0, column=1, padx=(20, 0), pady=(20, 0), sticky="new")
+        self.search_frame.grid_columnconfigure(0, weight=1)
+        self.search_entry = ctk.CTkEntry(self.search_frame, placeholder_text="Buscar servicio...")
+        self.search_entry.grid(row=0, column=0, sticky="ew")
+        self.search_entry.bind("<KeyRelease>", lambda event: self._schedule_search())
+        self._search_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search", initializer=diagnostics.profile_current_thread)
+        self._search_after_id = None
+        self._search_generation = 0
+        self.fuzzy_var = ctk.BooleanVar(value=False)
+        self.in_fields_var = ctk.BooleanVar(value=False)
+        self.notes_indexed = False
+        self._notes_generation = 0
+        ctk.CTkCheckBox(self.search_frame, text="Aproximada", variable=self.fuzzy_var, width=20, command=self._start_search).grid(row=0, column=1, padx=(10, 0))
+        ctk.CTkCheckBox(self.search_frame, text="Usuario/Notas", variable=self.in_fields_var, width=20, command=self._on_in_fields_toggle).grid(row=0, column=2, padx=(10, 0))
 
-        self.password_list_frame = ctk.CTkScrollableFrame(self, label_text="Tus Contraseñas")
+        self.password_list_frame = VirtualListFrame(self, command=self.show_entry_details, label_text="Tus Contraseñas")
         self.password_list_frame.grid(row=0, column=1, padx=(20, 0), pady=(60, 20), sticky="nsew")
-        self.password_list_frame.grid_columnconfigure(0, weight=1)
 
         self.detail_frame = ctk.CTkFrame(self)
         self.detail_frame.grid(row=0, column=2, padx=(0, 20), pady=(20, 20), sticky="nsew")
@@ -211,90 +510,328 @@ class MainAppFrame(ctk.CTkFrame):
         self.detail_frame.grid_rowconfigure(5, weight=1)
         self.detail_label = ctk.CTkLabel(self.detail_frame, text="Selecciona una entrada o añade una nueva", font=ctk.CTkFont(size=16))
         self.detail_label.grid(row=0, column=0, padx=20, pady=20)
+
+        # Status bar (background saves)
+        self.status_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.status_frame.grid(row=1, column=1, columnspan=2, padx=20, pady=(0, 10), sticky="ew")
+        self.status_label = ctk.CTkLabel(self.status_frame, text="")
+        self.status_label.grid(row=0, column=0, sticky="w")
+        self.status_progress = ctk.CTkProgressBar(self.status_frame, mode="indeterminate", width=80)
+        self._purge_after_id = None
+        self._poll_after_id = None
         self.refresh_password_list()
+        self._start_timers()
 
-    def refresh_password_list(self):
-        for widget in self.password_list_frame.winfo_children():
+    def _start_timers(self):
+        self._purge_after_id = self.after(SECRET_CACHE_PURGE_MS, self._purge_secret_cache)
+        self._poll_after_id = self.after(VAULT_POLL_MS, self._poll_vault_changes)
+
+    def _stop_timers(self):
+        for after_id in (self._search_after_id, self._purge_after_id, self._poll_after_id):
+            if after_id is not None:
+                self.after_cancel(after_id)
+        self._search_after_id = self._purge_after_id = self._poll_after_id = None
+
+    def on_lock(self):
+        """
+        Vacía la pantalla al bloquear (detalles, lista, búsqueda y diálogos abiertos) sin destruir los widgets.
+        """
+        self._stop_timers()
+        self._search_generation += 1
+        for child in self.winfo_children():
+            if isinstance(child, ctk.CTkToplevel):
+                child.destroy()
+        self._clear_details()
+        self.password_list_frame.set_items([])
+        self.search_entry.delete(0, ctk.END)
+        self.notes_indexed = False
+        self._notes_generation += 1
+        self.in_fields_var.set(False)
+        self.set_status("")
+
+    def on_unlock(self):
+        self.refresh_password_list()
+        self._start_timers()
+
+    def _clear_details(self):
+        self.current_selected_entry = None
+        self.edit_button.configure(state="disabled")
+        self.delete_button.configure(state="disabled")
+        for widget in self.detail_frame.winfo_children():
             widget.destroy()
-        search_query = self.search_entry.get().lower()
-        filtered_services = [s for s in self.master.passwords.keys() if search_query in s.lower()]
-        sorted_services = sorted(filtered_services)
-        for i, service in enumerate(sorted_services):
-            button = ctk.CTkButton(self.password_list_frame, text=service, command=lambda s=service: self.show_entry_details(s))
-            button.grid(row=i, column=0, padx=5, pady=5, sticky="ew")
+        self.detail_label = ctk.CTkLabel(self.detail_frame, text="Selecciona una entrada o añade una nueva", font=ctk.CTkFont(size=16))
+        self.detail_label.grid(row=0, column=0, padx=20, pady=20)
+
+    def set_status(self, text: str, busy: bool = False, error: bool = False):
+        self.status_label.configure(text=text, text_color="red" if error else ("gray10", "gray90"))
+        if busy:
+            self.status_progress.grid(row=0, column=1, padx=10)
+            self.status_progress.start()
+        else:
+            self.status_progress.stop()
+            self.status_progress.grid_remove()
+
+    def _purge_secret_cache(self):
+        self._purge_after_id = None
+        if not self.winfo_exists() or self.master.vault is None:
+            return
+        self.master.vault.secret_cache.purge_expired()
+        self._purge_after_id = self.after(SECRET_CACHE_PURGE_MS, self._purge_secret_cache)
+
+    def _poll_vault_changes(self):
+        """
+        Comprueba en segundo plano si otra instancia modificó la bóveda; solo se releen los registros nuevos.
+        Los datos para el índice de búsqueda (y las notas, si se buscan) se descifran en el mismo hilo y de una pasada.
+        """
+        self._poll_after_id = None
+        vault = self.master.vault
+        if not self.winfo_exists() or vault is None:
+            return
+        with_notes = self.notes_indexed
+
+        def poll():
+            changed = vault.refresh()
+            present = [service for service in changed if service in vault]
+            if with_notes:
+                updates = {service: (data.get("username", ""), data.get("notes", "")) for service, data in vault.items(services=present)}
+            else:
+                updates = {service: (vault.get_meta(service, {}).get("username", ""), None) for service in present}
+            return changed, updates
+
+        self.master.run_in_background(poll, on_done=lambda result: self._on_vault_changes(vault, *result), on_error=self._on_vault_poll_error)
+
+    def _on_vault_changes(self, vault, changed: set, updates: dict):
+        if vault is not self.master.vault or not self.master.is_logged_in:
+            return
+        if changed:
+            if not self.notes_indexed:
+                updates = {service: (username, None) for service, (username, _) in updates.items()}
+            self.master.search_index.update(updates, [service for service in changed if service not in updates])
+            selected = self.current_selected_entry
+            self.refresh_password_list()
+            if selected in vault:
+                self.show_entry_details(selected)
+            elif selected is not None:
+                self._clear_details()
+            self.set_status(f"{len(changed)} entradas actualizadas desde otra instancia")
+        self._poll_after_id = self.after(VAULT_POLL_MS, self._poll_vault_changes)
+
+    def _on_vault_poll_error(self, error: Exception):
+        # Usually another instance holding the lock for too long; try again on the next tick
+        if self.master.is_logged_in:
+            self.set_status(f"No se pudo comprobar la bóveda: {error}", error=True)
+            self._poll_after_id = self.after(VAULT_POLL_MS, self._poll_vault_changes)
+
+    def refresh_password_list(self):
+        """
+        Actualiza la lista de inmediato (tras altas, ediciones o borrados), descartando búsquedas en curso.
+        """
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+            self._search_after_id = None
+        self._search_generation += 1
+        services = self.master.search_index.search(self.search_entry.get(), fuzzy=self.fuzzy_var.get(), in_fields=self.in_fields_var.get())
+        self._show_search_result(services)
+
+    def destroy(self):
+        self._search_generation += 1
+        self._search_executor.shutdown(wait=False, cancel_futures=True)
+        super().destroy()
+
+    def _schedule_search(self):
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(SEARCH_DEBOUNCE_MS, self._start_search)
+
+    def _start_search(self):
+        """
+        Lanza la búsqueda en el hilo de búsqueda; solo se mostrará el resultado de la consulta más reciente.
+        """
+        self._search_after_id = None
+        self._search_generation += 1
+        generation = self._search_generation
+        search_index = self.master.search_index
+        query, fuzzy, in_fields = self.search_entry.get(), self.fuzzy_var.get(), self.in_fields_var.get()
+
+        def run_search():
+            if generation != self._search_generation:
+                return None # A newer query superseded this one while it was queued
+            return search_index.search(query, fuzzy=fuzzy, in_fields=in_fields)
+
+        future = self._search_executor.submit(run_search)
+        self.after(SEARCH_POLL_MS, lambda: self._poll_search(future, generation))
+
+    def _poll_search(self, future, generation: int):
+        if generation != self._search_generation or not self.winfo_exists():
+            future.cancel()
+            return
+        if not future.done():
+            self.after(SEARCH_POLL_MS, lambda: self._poll_search(future, generation))
+            return
+        self._show_search_result(future.result())
+
+    @timed("ui.list_rebuild")
+    def _show_search_result(self, services: list):
+        self.password_list_frame.set_items(services)
         self.edit_button.configure(state="disabled")
         self.delete_button.configure(state="disabled")
         self.current_selected_entry = None
 
+    def _on_in_fields_toggle(self):
+        """
+        Carga las notas en el índice (en el hilo de la bóveda) al activar el filtro y las olvida al desactivarlo.
+        """
+        self._notes_generation += 1
+        if not self.in_fields_var.get():
+            self.notes_indexed = False
+            self.master.search_index.clear_notes()
+        elif not self.notes_indexed:
+            self._load_notes()
+        self._start_search()
+
+    def _load_notes(self):
+        generation = self._notes_generation
+        vault, search_index = self.master.vault, self.master.search_index
+
+        def load_notes():
+            # Notes are only decrypted when the user asks to search them
+            search_index.set_notes((service, data.get("notes", "")) for service, data in vault.items())
+
+        self.set_status("Cargando notas para la búsqueda...", busy=True)
+        self.master.run_in_background(load_notes, on_done=lambda _: self._on_notes_loaded(generation, search_index),
+                                      on_error=self._on_notes_error)
+
+    def _on_notes_loaded(self, generation: int, search_index: SearchIndex):
+        if generation != self._notes_generation or search_index is not self.master.search_index:
+            search_index.clear_notes() # The filter was turned off (or the vault locked) while loading
+            return
+        self.notes_indexed = True
+        self.set_status("")
+        self._start_search()
+
+    def _on_notes_error(self, error: Exception):
+        if self.master.is_logged_in:
+            self.in_fields_var.set(False)
+            self.set_status(f"No se pudieron cargar las notas: {error}", error=True)
+
+    def _index_entry(self, service: str, data: dict):
+        notes = data.get("notes", "") if self.notes_indexed else None
+        self.master.search_index.put(service, data.get("username", ""), notes)
+
     def show_entry_details(self, service_name: str):
+        """
+        Muestra la entrada seleccionada; el secreto se lee y descifra en el hilo de la bóveda.
+        """
         self.current_selected_entry = service_name
         self.edit_button.configure(state="normal")
         self.delete_button.configure(state="normal")
         for widget in self.detail_frame.winfo_children():
             widget.destroy()
-        entry_data = self.master.passwords.get(service_name, {})
         ctk.CTkLabel(self.detail_frame, text=f"Servicio: {service_name}", font=ctk.CTkFont(size=18, weight="bold")).grid(row=0, column=0, padx=20, pady=10, sticky="w")
+        vault = self.master.vault
+        self.master.run_in_background(lambda: vault.get(service_name, {}), on_done=lambda entry_data: self._show_entry_data(vault, service_name, entry_data),
+                                      on_error=self._on_secret_error)
+
+    def _show_entry_data(self, vault, service_name: str, entry_data: dict):
+        if vault is not self.master.vault or service_name != self.current_selected_entry:
+            return # Locked or another entry was selected while the secret was being read
         username_label = ctk.CTkLabel(self.detail_frame, text=f"Usuario: {entry_data.get('username', '')}", font=ctk.CTkFont(size=14))
         username_label.grid(row=1, column=0, padx=20, pady=5, sticky="w")
-        copy_username_button = ctk.CTkButton(self.detail_frame, text="Copiar", width=70, command=lambda: self._copy_to_clipboard(entry_data.get('username', '')))
+        copy_username_button = ctk.CTkButton(self.detail_frame, text="Copiar", width=70, command=lambda: self._copy_to_clipboard(self.master.vault.get_meta(service_name, {}).get('username', '')))
         copy_username_button.grid(row=1, column=1, padx=5, pady=5, sticky="w")
         password_label = ctk.CTkLabel(self.detail_frame, text=f"Contraseña: {entry_data.get('password', '')}", font=ctk.CTkFont(size=14))
         password_label.grid(row=2, column=0, padx=20, pady=5, sticky="w")
-        copy_password_button = ctk.CTkButton(self.detail_frame, text="Copiar", width=70, command=lambda: self._copy_to_clipboard(entry_data.get('password', '')))
+        # Secrets are re-read from the vault on click instead of being captured by the callback
+        copy_password_button = ctk.CTkButton(self.detail_frame, text="Copiar", width=70, command=lambda: self._copy_secret(service_name))
         copy_password_button.grid(row=2, column=1, padx=5, pady=5, sticky="w")
         ctk.CTkLabel(self.detail_frame, text=f"Notas: {entry_data.get('notes', '')}", font=ctk.CTkFont(size=14)).grid(row=3, column=0, padx=20, pady=5, sticky="w")
 
+    def _copy_secret(self, service_name: str):
+        vault = self.master.vault
+        self.master.run_in_background(lambda: vault.get_secret(service_name).get('password', ''),
+                                      on_done=lambda password: self._on_secret_read(vault, password), on_error=self._on_secret_error)
+
+    def _on_secret_read(self, vault, password: str):
+        if vault is self.master.vault:
+            self._copy_to_clipboard(password)
+
+    def _on_secret_error(self, error: Exception):
+        # Typically another instance holding the vault lock past LOCK_TIMEOUT
+        if self.master.is_logged_in:
+            self.set_status(f"No se pudo leer la entrada: {error}", error=True)
+            message_box(title="Error", message=f"No se pudo leer la entrada: {error}", icon="cancel")
+
     def _copy_to_clipboard(self, text: str):
         self.clipboard_clear()
         self.clipboard_append(text)
-        CTkMessagebox.CTkMessagebox(title="Copiado", message="Texto copiado al portapapeles.", icon="info")
+        message_box(title="Copiado", message="Texto copiado al portapapeles.", icon="info")
 
     def add_new_entry(self):
         AddEditEntryDialog(self, self._on_add_save)
 
     def _on_add_save(self, new_data: dict):
         service = new_data.pop("service")
-        if service in self.master.passwords:
-            CTkMessagebox.CTkMessagebox(title="Error", message=f"El servicio '{service}' ya existe.", icon="warning")
+        if service in self.master.vault:
+            message_box(title="Error", message=f"El servicio '{service}' ya existe.", icon="warning")
             return
-        self.master.passwords[service] = new_data
-        self.master.save_passwords()
+        self.master.save_entry(service, new_data)
+        self._index_entry(service, new_data)
         self.refresh_password_list()
 
     def edit_selected_entry(self):
         if self.current_selected_entry:
-            entry_data = self.master.passwords.get(self.current_selected_entry, {})
-            dialog_data = entry_data.copy()
-            dialog_data["service"] = self.current_selected_entry
-            AddEditEntryDialog(self, self._on_edit_save, entry_data=dialog_data)
+            service, vault = self.current_selected_entry, self.master.vault
+            self.master.run_in_background(lambda: vault.get(service, {}), on_done=lambda entry_data: self._open_edit_dialog(vault, service, entry_data),
+                                          on_error=self._on_secret_error)
         else:
-            CTkMessagebox.CTkMessagebox(title="Advertencia", message="Selecciona una entrada para editar.", icon="warning")
+            message_box(title="Advertencia", message="Selecciona una entrada para editar.", icon="warning")
+
+    def _open_edit_dialog(self, vault, service: str, entry_data: dict):
+        if vault is not self.master.vault:
+            return
+        dialog_data = entry_data.copy()
+        dialog_data["service"] = service
+        AddEditEntryDialog(self, self._on_edit_save, entry_data=dialog_data)
 
     def _on_edit_save(self, updated_data: dict):
         service = updated_data.pop("service")
-        self.master.passwords[service] = updated_data
-        self.master.save_passwords()
+        self.master.save_entry(service, updated_data)
+        self._index_entry(service, updated_data)
         self.refresh_password_list()
         self.show_entry_details(service)
 
     def delete_selected_entry(self):
         if self.current_selected_entry:
-            msg = CTkMessagebox.CTkMessagebox(title="Confirmar Eliminación", message=f"¿Estás seguro de que quieres eliminar '{self.current_selected_entry}'?", icon="question", option_1="No", option_2="Sí")
+            msg = message_box(title="Confirmar Eliminación", message=f"¿Estás seguro de que quieres eliminar '{self.current_selected_entry}'?", icon="question", option_1="No", option_2="Sí")
             response = msg.get()
             if response == "Sí":
-                del self.master.passwords[self.current_selected_entry]
-                self.master.save_passwords()
+                self.master.delete_entry(self.current_selected_entry)
+                self.master.search_index.remove(self.current_selected_entry)
                 self.refresh_password_list()
-                for widget in self.detail_frame.winfo_children():
-                    widget.destroy()
-                self.detail_label = ctk.CTkLabel(self.detail_frame, text="Selecciona una entrada o añade una nueva", font=ctk.CTkFont(size=16))
-                self.detail_label.grid(row=0, column=0, padx=20, pady=20)
+                self._clear_details()
             else:
                 print("Eliminación cancelada.")
 
     def show_password_generator(self):
         PasswordGeneratorDialog(self)
 
+    def show_transfer_dialog(self):
+        TransferDialog(self)
+
+    def show_audit_dialog(self):
+        AuditDialog(self)
+
+    def reload_entries(self):
+        """
+        Muestra la lista tras un cambio masivo (importación); el índice ya se reconstruyó en segundo plano
+        sin notas, así que se vuelven a cargar si el filtro está activo.
+        """
+        self.notes_indexed = False
+        self._notes_generation += 1
+        if self.in_fields_var.get():
+            self._load_notes()
+        self.refresh_password_list()
+
 class AddEditEntryDialog(ctk.CTkToplevel):
     """
     Diálogo para añadir o editar entradas de contraseñas.
@@ -352,12 +889,252 @@ class AddEditEntryDialog(ctk.CTkToplevel):
         password = self.password_entry.get()
         notes = self.notes_textbox.get("0.0", "end-1c")
         if not service or not username or not password:
-            CTkMessagebox.CTkMessagebox(title="Error", message="Servicio, Usuario y Contraseña no pueden estar vacíos.", icon="warning")
+            message_box(title="Error", message="Servicio, Usuario y Contraseña no pueden estar vacíos.", icon="warning")
             return
         new_data = {"service": service, "username": username, "password": password, "notes": notes}
         self.on_save_callback(new_data)
         self.destroy()
 
+class TransferDialog(ctk.CTkToplevel):
+    """
+    Diálogo para importar y exportar entradas (CSV, JSON propio o de Bitwarden).
+    """
+    CONFLICT_LABELS = {"Omitir repetidas": "skip", "Reemplazar": "overwrite", "Renombrar": "rename"}
+    FILE_TYPES = [("CSV o JSON", "*.csv *.json"), ("Todos los archivos", "*.*")]
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.app = master.master
+        self.title("Importar / Exportar")
+        self.geometry("420x300")
+        self.transient(master)
+        self.grab_set()
+        self.grid_columnconfigure(1, weight=1)
+        self.progress_count = 0 # Written by the vault thread, read by the Tk thread
+        self.running = False
+        ctk.CTkLabel(self, text="Repetidas:").grid(row=0, column=0, padx=10, pady=10, sticky="w")
+        self.conflict_menu = ctk.CTkOptionMenu(self, values=list(self.CONFLICT_LABELS))
+        self.conflict_menu.grid(row=0, column=1, padx=10, pady=10, sticky="ew")
+        self.import_button = ctk.CTkButton(self, text="Importar archivo...", command=self.import_event)
+        self.import_button.grid(row=1, column=0, columnspan=2, padx=10, pady=10, sticky="ew")
+        ctk.CTkLabel(self, text="Formato:").grid(row=2, column=0, padx=10, pady=10, sticky="w")
+        self.format_menu = ctk.CTkOptionMenu(self, values=list(transfer.EXPORT_FORMATS))
+        self.format_menu.grid(row=2, column=1, padx=10, pady=10, sticky="ew")
+        self.export_button = ctk.CTkButton(self, text="Exportar archivo...", command=self.export_event)
+        self.export_button.grid(row=3, column=0, columnspan=2, padx=10, pady=10, sticky="ew")
+        self.progress_label = ctk.CTkLabel(self, text="")
+        self.progress_label.grid(row=4, column=0, columnspan=2, padx=10, pady=10)
+
+    def _on_progress(self, count: int):
+        self.progress_count = count
+
+    def _poll_progress(self):
+        if not self.running or not self.winfo_exists():
+            return
+        self.progress_label.configure(text=f"{self.progress_count} entradas procesadas...")
+        self.after(TRANSFER_PROGRESS_MS, self._poll_progress)
+
+    def _start(self, func, on_done):
+        self.running = True
+        self.progress_count = 0
+        self.import_button.configure(state="disabled")
+        self.export_button.configure(state="disabled")
+        self._poll_progress()
+        self.app.run_in_background(func, on_done=lambda result: self._finish(on_done, result), on_error=self._on_error)
+
+    def _finish(self, on_done, result):
+        self.running = False
+        if self.winfo_exists():
+            self.import_button.configure(state="normal")
+            self.export_button.configure(state="normal")
+        on_done(result)
+
+    def _on_error(self, error: Exception):
+        self._finish(lambda result: None, None)
+        if self.winfo_exists():
+            self.progress_label.configure(text="")
+        message_box(title="Error", message=f"No se pudo completar la operación: {error}", icon="cancel")
+
+    def import_event(self):
+        path = filedialog.askopenfilename(parent=self, title="Importar", filetypes=self.FILE_TYPES)
+        if not path:
+            return
+        vault, search_index = self.app.vault, self.app.search_index
+        on_conflict = self.CONFLICT_LABELS[self.conflict_menu.get()]
+
+        def run_import():
+            stats = transfer.import_file(vault, path, on_conflict=on_conflict, progress=self._on_progress)
+            search_index.build((service, vault.get_meta(service).get("username", "")) for service in vault.services())
+            return stats
+
+        self._start(run_import, self._on_imported)
+
+    def _on_imported(self, stats: dict):
+        if self.app.is_logged_in and self.app.main_app_frame:
+            self.app.main_app_frame.reload_entries()
+            self.app.main_app_frame.set_status(f"Importadas {stats['imported']} entradas")
+        if self.winfo_exists():
+            self.progress_label.configure(text=f"Importadas {stats['imported']} entradas, omitidas {stats['skipped']} repetidas.")
+
+    def export_event(self):
+        msg = message_box(title="Exportar", message="El archivo exportado contendrá tus contraseñas sin cifrar. ¿Continuar?", icon="warning", option_1="No", option_2="Sí")
+        if msg.get() != "Sí":
+            return
+        fmt = self.format_menu.get()
+        extension = ".csv" if fmt == "csv" else ".json"
+        path = filedialog.asksaveasfilename(parent=self, title="Exportar", defaultextension=extension, filetypes=self.FILE_TYPES)
+        if not path:
+            return
+        vault = self.app.vault
+        self._start(lambda: transfer.export_file(vault, path, fmt, progress=self._on_progress), self._on_exported)
+
+    def _on_exported(self, count: int):
+        if self.winfo_exists():
+            self.progress_label.configure(text=f"Exportadas {count} entradas.")
+
+class AuditDialog(ctk.CTkToplevel):
+    """
+    Informe de contraseñas débiles, repetidas o filtradas de toda la bóveda.
+    """
+    def __init__(self, master):
+        super().__init__(master)
+        self.app = master.master
+        self.title("Auditoría de contraseñas")
+        self.geometry("720x460")
+        self.transient(master)
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+        self.progress_count = 0 # Written by the vault thread, read by the Tk thread
+        self.running = False
+        self.report = None
+        self.report_textbox = ctk.CTkTextbox(self, font=ctk.CTkFont(family="Courier", size=12), wrap="none")
+        self.report_textbox.grid(row=0, column=0, columnspan=3, padx=10, pady=10, sticky="nsew")
+        self.show_all_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(self, text="Mostrar todas", variable=self.show_all_var, command=self._show_report).grid(row=1, column=0, padx=10, pady=10, sticky="w")
+        self.audit_button = ctk.CTkButton(self, text="Analizar de nuevo", command=self.audit_event)
+        self.audit_button.grid(row=1, column=1, padx=10, pady=10, sticky="ew")
+        ctk.CTkButton(self, text="Cerrar", command=self.destroy).grid(row=1, column=2, padx=10, pady=10, sticky="ew")
+        self.rotate_button = ctk.CTkButton(self, text="Rotar las marcadas", command=self.rotate_event, state="disabled")
+        self.rotate_button.grid(row=2, column=1, columnspan=2, padx=10, pady=(0, 10), sticky="ew")
+        self.audit_event()
+
+    def _on_progress(self, count: int):
+        self.progress_count = count
+
+    def _poll_progress(self):
+        if not self.running or not self.winfo_exists():
+            return
+        self._set_text(f"Analizando... {self.progress_count} entradas")
+        self.after(TRANSFER_PROGRESS_MS, self._poll_progress)
+
+    def audit_event(self):
+        if self.running or not self.app.is_logged_in:
+            return
+        vault = self.app.vault
+        if self.app.auditor is None:
+            import audit
+            self.app.auditor = audit.Auditor()
+        auditor = self.app.auditor
+        self._set_running(True)
+        self._poll_progress()
+        self.app.run_in_background(lambda: auditor.audit(vault, self._on_progress), on_done=self._on_report, on_error=self._on_error)
+
+    def _set_running(self, running: bool):
+        self.running = running
+        self.progress_count = 0
+        if self.winfo_exists():
+            self.audit_button.configure(state="disabled" if running else "normal")
+            flagged = self.report is not None and self.report["summary"]["flagged"]
+            self.rotate_button.configure(state="normal" if flagged and not running else "disabled")
+
+    def _on_report(self, report: dict):
+        self.report = report
+        self._set_running(False)
+        if self.winfo_exists():
+            self._show_report()
+
+    def _on_error(self, error: Exception):
+        self._set_running(False)
+        if self.winfo_exists():
+            self._set_text(f"No se pudo completar la operación: {error}")
+
+    def rotate_event(self):
+        """
+        Cambia de una vez las contraseñas de todas las entradas con problemas por otras generadas.
+        """
+        if self.running or self.report is None or not self.app.is_logged_in:
+            return
+        flagged = [service for service, analysis in self.report["entries"].items() if analysis["issues"]]
+        msg = message_box(title="Rotar contraseñas",
+                          message=f"Se generarán contraseñas nuevas para {len(flagged)} entradas. Tendrás que cambiarlas también en cada servicio. ¿Continuar?",
+                          icon="warning", option_1="No", option_2="Sí")
+        if msg.get() != "Sí":
+            return
+        vault = self.app.vault
+        self._set_running(True)
+        self._poll_progress()
+        self.app.run_in_background(lambda: generator.rotate_passwords(vault, flagged, progress=self._on_progress),
+                                   on_done=self._on_rotated, on_error=self._on_error)
+
+    def _on_rotated(self, rotated: dict):
+        self._set_running(False)
+        main_frame = self.app.main_app_frame
+        if self.app.is_logged_in and main_frame:
+            main_frame.set_status(f"{len(rotated)} contraseñas rotadas")
+            if main_frame.current_selected_entry in rotated:
+                main_frame.show_entry_details(main_frame.current_selected_entry)
+        if self.winfo_exists():
+            self.audit_event()
+
+    def _show_report(self):
+        if self.report is not None:
+            import audit
+            self._set_text(audit.format_report(self.report, self.show_all_var.get()))
+
+    def _set_text(self, text: str):
+        self.report_textbox.configure(state="normal")
+        self.report_textbox.delete("0.0", "end")
+        self.report_textbox.insert("0.0", text)
+        self.report_textbox.configure(state="disabled")
+
+class DiagnosticsDialog(ctk.CTkToplevel):
+    """
+    Vista oculta (Ctrl+Mayús+D) con los tiempos de las rutas críticas, para diagnosticar bloqueos.
+    """
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Diagnóstico")
+        self.geometry("720x420")
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+        self.report_textbox = ctk.CTkTextbox(self, font=ctk.CTkFont(family="Courier", size=12), wrap="none")
+        self.report_textbox.grid(row=0, column=0, columnspan=3, padx=10, pady=10, sticky="nsew")
+        ctk.CTkButton(self, text="Reiniciar", command=self.reset_event).grid(row=1, column=0, padx=10, pady=10, sticky="ew")
+        self.profile_button = ctk.CTkButton(self, text="Guardar perfil", command=self.dump_profile_event)
+        self.profile_button.grid(row=1, column=1, padx=10, pady=10, sticky="ew")
+        if diagnostics.PROFILE_PATH is None:
+            self.profile_button.configure(state="disabled")
+        ctk.CTkButton(self, text="Cerrar", command=self.destroy).grid(row=1, column=2, padx=10, pady=10, sticky="ew")
+        self.refresh()
+
+    def refresh(self):
+        if not self.winfo_exists():
+            return
+        self.report_textbox.configure(state="normal")
+        self.report_textbox.delete("0.0", "end")
+        self.report_textbox.insert("0.0", diagnostics.report())
+        self.report_textbox.configure(state="disabled")
+        if diagnostics.ENABLED:
+            self.after(DIAGNOSTICS_REFRESH_MS, self.refresh)
+
+    def reset_event(self):
+        diagnostics.reset()
+        self.refresh()
+
+    def dump_profile_event(self):
+        if diagnostics.dump_profile():
+            message_box(title="Perfil", message=f"Perfil guardado en {diagnostics.PROFILE_PATH}", icon="info")
+
 class PasswordGeneratorDialog(ctk.CTkToplevel):
     """
     Diálogo para generar contraseñas seguras.
@@ -399,21 +1176,16 @@ class PasswordGeneratorDialog(ctk.CTkToplevel):
         self.length_label.configure(text=f"{int(value)}")
 
     def generate_password(self):
-        import secrets
-        import string
         length = int(self.length_slider.get())
-        characters = ""
-        if self.uppercase_var.get(): characters += string.ascii_uppercase
-        if self.lowercase_var.get(): characters += string.ascii_lowercase
-        if self.digits_var.get(): characters += string.digits
-        if self.symbols_var.get(): characters += string.punctuation
-        if not characters:
+        selected = {"upper": self.uppercase_var, "lower": self.lowercase_var, "digits": self.digits_var, "symbols": self.symbols_var}
+        classes = [name for name, var in selected.items() if var.get()]
+        if not classes:
             self.generated_password_entry.configure(state="normal")
             self.generated_password_entry.delete(0, ctk.END)
             self.generated_password_entry.insert(0, "Selecciona al menos un tipo de carácter")
             self.generated_password_entry.configure(state="readonly")
             return
-        password = ''.join(secrets.choice(characters) for i in range(length))
+        password = generator.generate_password(length, classes) # At least one character of each selected type
         self.generated_password_entry.configure(state="normal")
         self.generated_password_entry.delete(0, ctk.END)
         self.generated_password_entry.insert(0, password)
@@ -424,8 +1196,9 @@ class PasswordGeneratorDialog(ctk.CTkToplevel):
         if password and password != "Selecciona al menos un tipo de carácter":
             self.clipboard_clear()
             self.clipboard_append(password)
-            CTkMessagebox.CTkMessagebox(title="Copiado", message="Contraseña copiada al portapapeles.", icon="info")
+            message_box(title="Copiado", message="Contraseña copiada al portapapeles.", icon="info")
 
 if __name__ == "__main__":
+    diagnostics.install_profiler()
     app = App()
     app.mainloop()
\ No newline at end of file
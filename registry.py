@@ -0,0 +1,98 @@
+"""
+Registro de bóvedas con nombre.
+
+Guarda en 'vaults.json', dentro del directorio de configuración del usuario, qué ruta
+corresponde a cada nombre y cuál es la bóveda por defecto:
+
+    {"default": "personal", "vaults": {"personal": "/home/ana/claves.enc", "trabajo": "..."}}
+
+El directorio es $GESTION_CLAVES_HOME si está definido; si no, $XDG_CONFIG_HOME/gestion-claves
+(o %APPDATA%\\gestion-claves en Windows). Sin registro se usa la bóveda clásica
+'passwords.json.enc' del directorio actual.
+"""
+import json
+import os
+
+# --- Constants ---
+HOME_ENV = "GESTION_CLAVES_HOME"
+VAULT_ENV = "GESTION_CLAVES_VAULT" # Name or path of the vault to open when none is given
+REGISTRY_FILE = "vaults.json"
+DEFAULT_VAULT_FILE = "passwords.json.enc"
+
+def config_dir() -> str:
+    path = os.environ.get(HOME_ENV)
+    if path:
+        return path
+    if os.name == "nt":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, "gestion-claves")
+
+def registry_path() -> str:
+    return os.path.join(config_dir(), REGISTRY_FILE)
+
+def load_registry() -> dict:
+    try:
+        with open(registry_path(), encoding="utf-8") as f:
+            registry = json.load(f)
+    except FileNotFoundError:
+        registry = {}
+    registry.setdefault("default", None)
+    registry.setdefault("vaults", {})
+    return registry
+
+def save_registry(registry: dict):
+    path = registry_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(registry, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, path)
+
+def list_vaults() -> dict:
+    """
+    Devuelve {nombre: ruta} de las bóvedas registradas.
+    """
+    return dict(load_registry()["vaults"])
+
+def add_vault(name: str, path: str, make_default: bool = False):
+    registry = load_registry()
+    registry["vaults"][name] = os.path.abspath(os.path.expanduser(path))
+    if make_default or registry["default"] is None:
+        registry["default"] = name
+    save_registry(registry)
+
+def remove_vault(name: str):
+    """
+    Olvida el nombre (el archivo de la bóveda no se toca).
+    """
+    registry = load_registry()
+    if registry["vaults"].pop(name, None) is None:
+        raise ValueError(f"No hay ninguna bóveda llamada '{name}'")
+    if registry["default"] == name:
+        registry["default"] = next(iter(registry["vaults"]), None)
+    save_registry(registry)
+
+def set_default(name: str):
+    registry = load_registry()
+    if name not in registry["vaults"]:
+        raise ValueError(f"No hay ninguna bóveda llamada '{name}'")
+    registry["default"] = name
+    save_registry(registry)
+
+def default_vault_name():
+    return load_registry()["default"]
+
+def resolve_vault(name_or_path: str = None) -> str:
+    """
+    Ruta de la bóveda a abrir: un nombre registrado, una ruta, $GESTION_CLAVES_VAULT,
+    la bóveda por defecto del registro o, en último caso, 'passwords.json.enc'.
+    """
+    name_or_path = name_or_path or os.environ.get(VAULT_ENV)
+    registry = load_registry()
+    if name_or_path:
+        return registry["vaults"].get(name_or_path, name_or_path)
+    if registry["default"] in registry["vaults"]:
+        return registry["vaults"][registry["default"]]
+    return DEFAULT_VAULT_FILE
@@ -0,0 +1,238 @@
+import re
+import threading
+from bisect import bisect_left
+from operator import itemgetter
+from diagnostics import timed
+
+# --- Constants ---
+NGRAM_SIZE = 3 # Shorter queries narrow the previous result or scan the lowercased names
+FIELD_SEPARATOR = "\0" # Joins username and notes; a typed query can never contain it
+BATCH_RESORT_MIN = 64 # From this many changes, update() re-sorts the key lists once instead of inserting one by one
+
+def ngrams(text: str, size: int = NGRAM_SIZE) -> set:
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+class SearchIndex:
+    """
+    Índice de búsqueda incremental sobre los nombres de servicio.
+
+    Mantiene las claves ordenadas junto a su versión en minúsculas, un índice de
+    trigramas de los nombres de servicio, el usuario y (solo mientras se cargan con
+    set_notes()) las notas de cada entrada ya en minúsculas, y el último resultado,
+    que se reutiliza cuando la consulta crece en lugar de volver a recorrer todas las claves.
+
+    Es seguro usarlo desde un hilo de búsqueda mientras el hilo de la interfaz lo actualiza.
+    """
+    def __init__(self):
+        self._keys = []
+        self._lower = []
+        self._fields = [] # Lowercased "username\0notes" of each key, aligned with _keys
+        self._extra = {}
+        self._notes = {} # Decrypted notes; only filled while notes search is on (see set_notes/clear_notes)
+        self._grams = {}
+        self._last = None # (query, fuzzy, in_fields, result)
+        self._lock = threading.Lock()
+
+    @timed("search.build")
+    def build(self, entries):
+        """
+        Construye el índice desde un iterable de (servicio, usuario).
+        """
+        pairs = sorted(((key.lower(), key, extra.lower()) for key, extra in entries))
+        with self._lock:
+            self._keys = [key for _, key, _ in pairs]
+            self._lower = [lower for lower, _, _ in pairs]
+            self._fields = [extra for _, _, extra in pairs]
+            self._extra = dict(zip(self._keys, self._fields))
+            self._notes, self._grams = {}, {}
+            for key, lower in zip(self._keys, self._lower):
+                self._index_grams(key, lower)
+            self._last = None
+
+    def put(self, key: str, extra: str = "", notes: str = None):
+        """
+        Añade o actualiza un servicio en el índice. Las notas solo se guardan si se pasan.
+        """
+        with self._lock:
+            position = self._position(key)
+            self._extra[key] = extra.lower()
+            if notes:
+                self._notes[key] = notes.lower()
+            else:
+                self._notes.pop(key, None)
+            if position is None:
+                lower = key.lower()
+                position = bisect_left(self._lower, lower)
+                while position < len(self._keys) and self._lower[position] == lower and self._keys[position] < key:
+                    position += 1 # Same order as build(): by lowercase name, then by the name itself
+                self._lower.insert(position, lower)
+                self._keys.insert(position, key)
+                self._fields.insert(position, self._field_text(key))
+                self._index_grams(key, lower)
+            else:
+                self._fields[position] = self._field_text(key)
+            self._last = None
+
+    @timed("search.set_notes")
+    def set_notes(self, entries):
+        """
+        Carga las notas desde un iterable de (servicio, notas) para buscar también en ellas.
+        """
+        notes = {key: text.lower() for key, text in entries if text}
+        with self._lock:
+            self._notes = {key: text for key, text in notes.items() if key in self._extra}
+            self._fields = [self._field_text(key) for key in self._keys]
+            self._last = None
+
+    def clear_notes(self):
+        """
+        Olvida las notas cargadas; las búsquedas en campos vuelven a mirar solo el usuario.
+        """
+        with self._lock:
+            self._notes = {}
+            self._fields = [self._extra[key] for key in self._keys]
+            self._last = None
+
+    @timed("search.update")
+    def update(self, entries: dict, removed=()):
+        """
+        Aplica de una vez un lote de cambios (p. ej. los de otra instancia): 'entries' es
+        {servicio: (usuario, notas o None)} y 'removed' los servicios borrados.
+        """
+        if len(entries) + len(removed) < BATCH_RESORT_MIN:
+            for key, (extra, notes) in entries.items():
+                self.put(key, extra, notes)
+            for key in removed:
+                self.remove(key)
+            return
+        with self._lock:
+            for key in removed:
+                if key in self._extra:
+                    self._unindex_grams(key, key.lower())
+                    del self._extra[key]
+                    self._notes.pop(key, None)
+            for key, (extra, notes) in entries.items():
+                if key not in self._extra:
+                    self._index_grams(key, key.lower())
+                self._extra[key] = extra.lower()
+                if notes:
+                    self._notes[key] = notes.lower()
+                else:
+                    self._notes.pop(key, None)
+            pairs = sorted((key.lower(), key) for key in self._extra)
+            self._keys = [key for _, key in pairs]
+            self._lower = [lower for lower, _ in pairs]
+            self._fields = [self._field_text(key) for key in self._keys]
+            self._last = None
+
+    def remove(self, key: str):
+        with self._lock:
+            position = self._position(key)
+            if position is None:
+                return
+            self._unindex_grams(key, self._lower[position])
+            del self._keys[position]
+            del self._lower[position]
+            del self._fields[position]
+            del self._extra[key]
+            self._notes.pop(key, None)
+            self._last = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _position(self, key: str):
+        if key not in self._extra:
+            return None
+        position = bisect_left(self._lower, key.lower())
+        while self._keys[position] != key:
+            position += 1
+        return position
+
+    def _field_text(self, key: str) -> str:
+        notes = self._notes.get(key)
+        return f"{self._extra[key]}{FIELD_SEPARATOR}{notes}" if notes else self._extra[key]
+
+    def _index_grams(self, key: str, lower: str):
+        for gram in ngrams(lower):
+            self._grams.setdefault(gram, set()).add(key)
+
+    def _unindex_grams(self, key: str, lower: str):
+        for gram in ngrams(lower):
+            postings = self._grams.get(gram)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self._grams[gram]
+
+    @timed("search.query")
+    def search(self, query: str, fuzzy: bool = False, in_fields: bool = False) -> list:
+        """
+        Devuelve los servicios que coinciden con 'query', en orden alfabético.
+
+        Con 'fuzzy' basta con que las letras aparezcan en orden (p. ej. "gml" -> "Gmail"),
+        y los resultados se ordenan por relevancia. Con 'in_fields' también se busca en
+        el usuario y, si se cargaron con set_notes(), en las notas.
+        """
+        query = query.lower().strip()
+        with self._lock:
+            if not query:
+                return list(self._keys)
+            candidates = None
+            if self._last is not None:
+                last_query, last_fuzzy, last_in_fields, last_result = self._last
+                narrows = query.startswith(last_query) if fuzzy else last_query in query
+                if narrows and (last_fuzzy, last_in_fields) == (fuzzy, in_fields):
+                    candidates = last_result
+            if fuzzy:
+                result = self._fuzzy(query, in_fields, candidates)
+            else:
+                result = self._substring(query, in_fields, candidates)
+            self._last = (query, fuzzy, in_fields, result)
+            return result
+
+    def _rows(self, candidates):
+        """
+        (clave, nombre, campos) en minúsculas de 'candidates', o de todas las claves si es None.
+        """
+        if candidates is None:
+            return zip(self._keys, self._lower, self._fields)
+        if len(candidates) * 8 < len(self._keys):
+            return ((key, key.lower(), self._fields[self._position(key)]) for key in candidates)
+        wanted = set(candidates)
+        return ((key, lower, fields) for key, lower, fields in zip(self._keys, self._lower, self._fields) if key in wanted)
+
+    def _substring(self, query: str, in_fields: bool, candidates):
+        if in_fields:
+            return [key for key, lower, fields in self._rows(candidates) if query in lower or query in fields]
+        if candidates is not None:
+            return [key for key in candidates if query in key.lower()]
+        if len(query) >= NGRAM_SIZE:
+            postings = sorted((self._grams.get(gram, ()) for gram in ngrams(query)), key=len)
+            hits = set(postings[0]).intersection(*postings[1:])
+            if len(hits) * 8 < len(self._keys):
+                # Few hits: sorting them is cheaper than walking the whole key array.
+                return sorted((key for key in hits if query in key.lower()), key=lambda key: (key.lower(), key))
+            return [key for key in self._keys if key in hits and query in key.lower()]
+        return [key for key, lower in zip(self._keys, self._lower) if query in lower]
+
+    def _fuzzy(self, query: str, in_fields: bool, candidates):
+        if len(query) == 1 and not in_fields:
+            # One letter ranks by its position; rows come in alphabetical order, so a stable sort keeps ties ordered
+            scored = [(lower.find(query), key) for key, lower, _ in self._rows(candidates) if query in lower]
+            scored.sort(key=itemgetter(0))
+            return [key for _, key in scored]
+        pattern = re.compile(".*?".join(re.escape(char) for char in query))
+        first = query[0]
+        scored = []
+        for key, lower, fields in self._rows(candidates):
+            match = pattern.search(lower) if first in lower else None
+            if match is not None:
+                # Tighter and earlier matches rank first
+                scored.append((match.end(), lower, key))
+            elif in_fields and first in fields:
+                match = pattern.search(fields)
+                if match is not None:
+                    scored.append((len(lower) + match.end() - match.start(), lower, key))
+        scored.sort()
+        return [key for _, _, key in scored]
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import vault
+
+MASTER_PASSWORD = "clave-de-prueba"
+
+@pytest.fixture(autouse=True)
+def fast_kdf(monkeypatch):
+    # Real iteration counts would make every test spend most of its time deriving keys
+    monkeypatch.setattr(vault, "DEFAULT_KDF_ITERATIONS", 1000)
+
+@pytest.fixture
+def vault_path(tmp_path):
+    return str(tmp_path / "passwords.json.enc")
@@ -0,0 +1,67 @@
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+import agent
+from agent import UnlockAgent
+
+pytestmark = pytest.mark.skipif(not agent.agent_supported(), reason="requiere sockets Unix")
+
+@pytest.fixture
+def running_agent(tmp_path):
+    socket_dir = tmp_path / "agent"
+    socket_dir.mkdir(mode=0o700)
+    server = UnlockAgent(str(socket_dir / "agent.sock"), idle_timeout=30)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not os.path.exists(server.socket_path):
+        assert time.monotonic() < deadline, "el agente no llegó a escuchar"
+        time.sleep(0.01)
+    yield server
+    agent.request({"op": "stop"}, server.socket_path)
+    thread.join(5)
+
+def send_raw(socket_path: str, payload: bytes) -> bytes:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(agent.CLIENT_TIMEOUT)
+        conn.connect(socket_path)
+        conn.sendall(payload)
+        return agent._recv_line(conn)
+
+@pytest.mark.parametrize("request_body", [[], "get", {"op": "get"}, {"op": "add", "vault": "x"}, {"op": "get", "vault": 1}])
+def test_dispatch_rejects_malformed_requests(request_body):
+    with pytest.raises(ValueError):
+        UnlockAgent("unused").dispatch(request_body)
+
+def test_unknown_operation_is_reported():
+    assert UnlockAgent("unused").dispatch({"op": "reboot"})["ok"] is False
+
+def test_keys_are_added_fetched_and_forgotten(running_agent, tmp_path):
+    socket_path = running_agent.socket_path
+    vault_path = str(tmp_path / "passwords.json.enc")
+    assert agent.get_key(vault_path, socket_path) is None
+    assert agent.add_key(vault_path, b"clave-derivada", socket_path)
+    assert agent.get_key(vault_path, socket_path) == b"clave-derivada"
+    assert agent.request({"op": "status"}, socket_path)["vaults"] == [agent.vault_id(vault_path)]
+    assert agent.forget_key(vault_path, socket_path)
+    assert agent.get_key(vault_path, socket_path) is None
+
+def test_malformed_requests_do_not_stop_the_agent(running_agent, tmp_path):
+    vault_path = str(tmp_path / "passwords.json.enc")
+    agent.add_key(vault_path, b"clave-derivada", running_agent.socket_path)
+    for payload in (b"no es json\n", b"[1, 2]\n", b'{"op": "add", "vault": null}\n', b"\xff\xfe\n"):
+        assert b'"ok": false' in send_raw(running_agent.socket_path, payload)
+    assert agent.get_key(vault_path, running_agent.socket_path) == b"clave-derivada"
+
+def test_a_stalled_client_does_not_make_others_time_out(running_agent):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stalled:
+        stalled.connect(running_agent.socket_path) # Connected but never sends its request
+        started = time.monotonic()
+        response = agent.request({"op": "status"}, running_agent.socket_path)
+        elapsed = time.monotonic() - started
+    assert response is not None and response["ok"]
+    assert elapsed < agent.CLIENT_TIMEOUT / 2
@@ -0,0 +1,80 @@
+import hashlib
+
+import pytest
+
+from audit import Auditor, BreachIndex, build_breach_index
+from conftest import MASTER_PASSWORD
+from vault import open_vault
+
+def sha1(password: str) -> bytes:
+    return hashlib.sha1(password.encode("utf-8")).digest()
+
+# --- Breach index ---
+def test_index_built_from_hashes_counts_each_one(tmp_path):
+    lines = [f"{sha1('123456').hex().upper()}:42\n", f"{sha1('qwerty').hex()}:7\n", "\n",
+             f"{sha1('123456').hex()}:8\n"] # Repeated hashes add up
+    path = str(tmp_path / "breach.idx")
+    assert build_breach_index(lines, path) == 2
+    index = BreachIndex(path)
+    try:
+        assert len(index) == 2
+        assert index.count(sha1("123456")) == 50
+        assert index.count(sha1("qwerty")) == 7
+        assert index.count(sha1("no-filtrada")) == 0
+    finally:
+        index.close()
+
+def test_index_built_from_plain_passwords(tmp_path):
+    path = str(tmp_path / "breach.idx")
+    passwords = ["contraseña\n", "abc123\r\n", "contraseña\n", "\n"] + [f"clave{i}\n" for i in range(1000)]
+    assert build_breach_index(passwords, path, plain=True) == 1002
+    index = BreachIndex(path)
+    try:
+        assert index.count(sha1("contraseña")) == 2
+        assert index.count(sha1("abc123")) == 1
+        assert all(index.count(sha1(f"clave{i}")) == 1 for i in range(1000))
+        assert index.count(sha1("clave1000")) == 0
+    finally:
+        index.close()
+
+def test_malformed_hash_line_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Línea 2"):
+        build_breach_index([f"{sha1('a').hex()}:1", "no-es-un-hash:3"], str(tmp_path / "breach.idx"))
+
+# --- Auditor ---
+@pytest.fixture
+def store(vault_path):
+    store = open_vault(MASTER_PASSWORD, vault_path, create=True)
+    store.apply_batch([
+        ("github", {"username": "ana", "password": "Compartida-2024!x"}),
+        ("gmail", {"username": "ana", "password": "Compartida-2024!x"}),
+        ("banco", {"username": "ana", "password": "Unica-y-Larga-#93k"}),
+        ("foro", {"username": "ana", "password": ""}),
+    ])
+    return store
+
+def test_shared_passwords_are_grouped_as_reused(store):
+    report = Auditor(breach_path="", workers=1).audit(store)
+    assert report["reused"] == [["github", "gmail"]]
+    assert "reused" in report["entries"]["github"]["issues"]
+    assert "reused" in report["entries"]["gmail"]["issues"]
+    assert report["entries"]["banco"]["issues"] == []
+    assert report["entries"]["foro"]["issues"] == ["empty"] # Empty passwords are never grouped
+    assert report["summary"]["issues"]["reused"] == 2
+
+def test_only_changed_entries_are_checked_again(store):
+    auditor = Auditor(breach_path="", workers=1)
+    assert auditor.audit(store)["summary"]["checked"] == 4
+    store.put("gmail", {"username": "ana", "password": "Otra-Distinta-77$q"})
+    report = auditor.audit(store)
+    assert report["summary"]["checked"] == 1
+    assert report["reused"] == []
+    assert "reused" not in report["entries"]["github"]["issues"]
+
+def test_breached_passwords_are_flagged(store, tmp_path):
+    path = str(tmp_path / "breach.idx")
+    build_breach_index(["Unica-y-Larga-#93k"], path, plain=True)
+    report = Auditor(breach_path=path, workers=1).audit(store)
+    assert report["entries"]["banco"]["breached"] == 1
+    assert "breached" in report["entries"]["banco"]["issues"]
+    assert "breached" not in report["entries"]["github"]["issues"]
@@ -0,0 +1,48 @@
+from collections import Counter
+
+import pytest
+
+import generator
+from conftest import MASTER_PASSWORD
+from generator import CHAR_CLASSES, generate_password, generate_passwords, rotate_passwords
+from vault import open_vault
+
+@pytest.mark.parametrize("classes", [("upper", "lower", "digits", "symbols"), ("digits",), ("lower", "symbols"), ("upper", "digits")])
+@pytest.mark.parametrize("length", [4, 16, 64])
+def test_every_password_has_each_selected_class_and_nothing_else(classes, length):
+    allowed = set("".join(CHAR_CLASSES[name] for name in classes))
+    passwords = generate_passwords(200, length, classes)
+    assert len(passwords) == 200
+    for password in passwords:
+        assert len(password) == length
+        assert set(password) <= allowed
+        assert all(set(password) & set(CHAR_CLASSES[name]) for name in classes)
+
+def test_shortest_length_uses_one_character_of_each_class():
+    for password in generate_passwords(50, 4):
+        assert sorted(sum(char in chars for char in password) for chars in CHAR_CLASSES.values()) == [1, 1, 1, 1]
+
+@pytest.mark.parametrize("length, classes", [(16, ()), (16, ("emoji",)), (3, ("upper", "lower", "digits", "symbols"))])
+def test_impossible_policies_are_rejected(length, classes):
+    with pytest.raises(ValueError):
+        generate_password(length, classes)
+
+def test_byte_table_maps_the_same_number_of_bytes_to_each_character():
+    for alphabet in ("".join(CHAR_CLASSES.values()), CHAR_CLASSES["digits"], CHAR_CLASSES["symbols"]):
+        table, rejected, _ = generator._translation(alphabet)
+        accepted = bytes(byte for byte in range(256) if byte not in rejected)
+        counts = Counter(accepted.translate(table).decode("ascii"))
+        assert set(counts) == set(alphabet)
+        assert len(set(counts.values())) == 1 # No character is more likely than another
+
+def test_rotation_keeps_username_and_notes(vault_path):
+    store = open_vault(MASTER_PASSWORD, vault_path, create=True)
+    store.apply_batch([
+        ("github", {"username": "ana", "password": "vieja", "notes": "2FA en el móvil"}),
+        ("gmail", {"username": "luis", "password": "vieja", "notes": ""}),
+    ])
+    rotated = rotate_passwords(store, ["github", "no-existe", "github"], length=20, classes=("lower", "digits"))
+    assert list(rotated) == ["github"]
+    assert len(rotated["github"]) == 20
+    assert store.get("github") == {"username": "ana", "password": rotated["github"], "notes": "2FA en el móvil"}
+    assert store.get("gmail")["password"] == "vieja"
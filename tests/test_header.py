@@ -0,0 +1,45 @@
+import base64
+import json
+import os
+
+from cryptography.fernet import Fernet
+
+import vault
+from conftest import MASTER_PASSWORD
+from vault import VAULT_MAGIC, open_vault
+
+def entry(password: str, username: str = "ana", notes: str = "") -> dict:
+    return {"username": username, "password": password, "notes": notes}
+
+def read_header(path: str) -> dict:
+    with open(path, "rb") as f:
+        return json.loads(f.readline()[len(VAULT_MAGIC) + 1:])
+
+def test_kdf_parameters_live_in_the_header(vault_path):
+    with open_vault(MASTER_PASSWORD, vault_path, create=True) as store:
+        store.put("github", entry("uno"))
+        key = store.key
+    header = read_header(vault_path)
+    assert header["kdf"]["name"] == vault.DEFAULT_KDF
+    assert vault.derive_key(MASTER_PASSWORD, header["kdf"]) == key
+    # An already derived key opens the vault without the password
+    assert open_vault(path=vault_path, key=key).get("github") == entry("uno")
+
+def test_legacy_vault_with_salt_file_is_migrated(vault_path):
+    salt = os.urandom(16)
+    kdf_params = {"name": "pbkdf2-sha256", "salt": base64.b64encode(salt).decode(), "iterations": vault.DEFAULT_KDF_ITERATIONS}
+    entries = {"github": entry("uno", notes="nota"), "gmail": entry("dos")}
+    with open(os.path.join(os.path.dirname(vault_path), vault.MASTER_PASSWORD_SALT_FILE), "wb") as f:
+        f.write(salt)
+    with open(vault_path, "wb") as f:
+        f.write(Fernet(vault.derive_key(MASTER_PASSWORD, kdf_params)).encrypt(json.dumps(entries).encode()))
+
+    store = open_vault(MASTER_PASSWORD, vault_path)
+    assert dict(store.items()) == entries
+    header = read_header(vault_path)
+    assert header["version"] == vault.VAULT_FORMAT_VERSION
+    assert header["kdf"] == kdf_params
+
+    # The salt now lives in the header, so the old file is no longer needed
+    os.remove(os.path.join(os.path.dirname(vault_path), vault.MASTER_PASSWORD_SALT_FILE))
+    assert dict(open_vault(MASTER_PASSWORD, vault_path).items()) == entries
@@ -0,0 +1,46 @@
+import os
+
+from conftest import MASTER_PASSWORD
+from vault import JOURNAL_SUFFIX, open_vault, write_journal
+
+def entry(password: str, username: str = "ana", notes: str = "") -> dict:
+    return {"username": username, "password": password, "notes": notes}
+
+def crash_before_append(vault_path: str, service: str, data: dict, applied: int = 0) -> bytes:
+    """
+    Deja el journal de un anexado de 'service' como si el proceso muriera tras escribir 'applied' bytes en la bóveda.
+    """
+    store = open_vault(MASTER_PASSWORD, vault_path)
+    payload = store._encode_put(service, data)
+    offset = os.path.getsize(vault_path)
+    write_journal(vault_path, payload, offset)
+    with open(vault_path, "ab") as f:
+        f.write(payload[:applied])
+    return payload
+
+def test_complete_journal_is_replayed(vault_path):
+    with open_vault(MASTER_PASSWORD, vault_path, create=True) as store:
+        store.put("github", entry("uno"))
+    payload = crash_before_append(vault_path, "gmail", entry("dos"), applied=10)
+
+    store = open_vault(MASTER_PASSWORD, vault_path)
+    assert store.get("gmail") == entry("dos")
+    assert store.get("github") == entry("uno")
+    assert not os.path.exists(vault_path + JOURNAL_SUFFIX)
+    with open(vault_path, "rb") as f:
+        assert f.read().endswith(payload)
+
+def test_incomplete_journal_is_discarded(vault_path):
+    with open_vault(MASTER_PASSWORD, vault_path, create=True) as store:
+        store.put("github", entry("uno"))
+    with open(vault_path, "rb") as f:
+        before = f.read()
+    crash_before_append(vault_path, "gmail", entry("dos"))
+    with open(vault_path + JOURNAL_SUFFIX, "r+b") as f:
+        f.truncate(os.path.getsize(vault_path + JOURNAL_SUFFIX) - 5)
+
+    store = open_vault(MASTER_PASSWORD, vault_path)
+    assert "gmail" not in store
+    assert not os.path.exists(vault_path + JOURNAL_SUFFIX)
+    with open(vault_path, "rb") as f:
+        assert f.read() == before
@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+from cryptography.fernet import InvalidToken
+
+from conftest import MASTER_PASSWORD
+from vault import RecordMismatch, decrypt_secret_line, open_vault
+
+def entry(password: str, username: str = "ana", notes: str = "") -> dict:
+    return {"username": username, "password": password, "notes": notes}
+
+def test_refresh_reads_records_appended_by_another_instance(vault_path):
+    reader = open_vault(MASTER_PASSWORD, vault_path, create=True)
+    with open_vault(MASTER_PASSWORD, vault_path) as writer:
+        writer.put("github", entry("uno"))
+    assert reader.refresh() == {"github"}
+    assert reader.get_secret("github")["password"] == "uno"
+
+def test_reads_follow_a_compaction_by_another_instance(vault_path):
+    with open_vault(MASTER_PASSWORD, vault_path, create=True) as store:
+        store.apply_batch((f"s{i}", entry(f"p{i}")) for i in range(20))
+        store.apply_batch((f"s{i}", None) for i in range(10))
+    reader = open_vault(MASTER_PASSWORD, vault_path)
+    with open_vault(MASTER_PASSWORD, vault_path) as writer:
+        writer.compact()
+    # The reader's offsets point into the old file; it must re-read before decrypting
+    assert reader.get_secret("s15")["password"] == "p15"
+    assert dict(reader.items()) == {f"s{i}": entry(f"p{i}") for i in range(10, 20)}
+
+def test_wrong_password_is_rejected_on_an_empty_vault(vault_path):
+    open_vault(MASTER_PASSWORD, vault_path, create=True)
+    with pytest.raises(InvalidToken):
+        open_vault("otra-clave", vault_path)
+    assert len(open_vault(MASTER_PASSWORD, vault_path)) == 0
+
+def test_concurrent_writers_keep_each_others_entries(vault_path):
+    open_vault(MASTER_PASSWORD, vault_path, create=True)
+    stores = [open_vault(MASTER_PASSWORD, vault_path) for _ in range(4)]
+
+    def write(number: int, store):
+        for i in range(10):
+            store.put(f"w{number}-{i}", entry(f"p{number}-{i}"))
+            store.flush()
+
+    threads = [threading.Thread(target=write, args=(number, store)) for number, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    reopened = open_vault(MASTER_PASSWORD, vault_path)
+    assert dict(reopened.items()) == {f"w{n}-{i}": entry(f"p{n}-{i}") for n in range(4) for i in range(10)}
+
+def test_secret_token_is_bound_to_its_service(vault_path):
+    with open_vault(MASTER_PASSWORD, vault_path, create=True) as store:
+        line = store._encode_put("github", entry("uno"))
+    with pytest.raises(RecordMismatch):
+        decrypt_secret_line(store.fernet, line, "gmail")
+    assert decrypt_secret_line(store.fernet, line, "github")["password"] == "uno"
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+import registry
+
+@pytest.fixture(autouse=True)
+def config_home(tmp_path, monkeypatch):
+    monkeypatch.setenv(registry.HOME_ENV, str(tmp_path / "config"))
+    monkeypatch.delenv(registry.VAULT_ENV, raising=False)
+    return tmp_path
+
+def test_without_registry_the_classic_vault_is_used():
+    assert registry.list_vaults() == {}
+    assert registry.default_vault_name() is None
+    assert registry.resolve_vault() == registry.DEFAULT_VAULT_FILE
+
+def test_first_vault_becomes_the_default(tmp_path):
+    registry.add_vault("personal", str(tmp_path / "personal.enc"))
+    registry.add_vault("trabajo", str(tmp_path / "trabajo.enc"))
+    assert registry.default_vault_name() == "personal"
+    assert registry.resolve_vault() == str(tmp_path / "personal.enc")
+    assert registry.resolve_vault("trabajo") == str(tmp_path / "trabajo.enc")
+    # Anything that is not a registered name is taken as a path
+    assert registry.resolve_vault("otra/boveda.enc") == "otra/boveda.enc"
+
+def test_environment_variable_selects_the_vault(tmp_path, monkeypatch):
+    registry.add_vault("personal", str(tmp_path / "personal.enc"))
+    registry.add_vault("trabajo", str(tmp_path / "trabajo.enc"))
+    monkeypatch.setenv(registry.VAULT_ENV, "trabajo")
+    assert registry.resolve_vault() == str(tmp_path / "trabajo.enc")
+
+def test_removing_the_default_promotes_another_vault(tmp_path):
+    registry.add_vault("personal", str(tmp_path / "personal.enc"))
+    registry.add_vault("trabajo", str(tmp_path / "trabajo.enc"), make_default=True)
+    assert registry.default_vault_name() == "trabajo"
+    registry.remove_vault("trabajo")
+    assert registry.default_vault_name() == "personal"
+    assert os.path.exists(registry.registry_path())
+    with pytest.raises(ValueError):
+        registry.remove_vault("trabajo")
+    with pytest.raises(ValueError):
+        registry.set_default("trabajo")
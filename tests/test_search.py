@@ -0,0 +1,114 @@
+import random
+
+from search import SearchIndex
+
+def subsequence_span(text: str, query: str):
+    start = end = text.find(query[0])
+    if start < 0:
+        return None
+    for char in query[1:]:
+        end = text.find(char, end + 1)
+        if end < 0:
+            return None
+    return start, end + 1
+
+class ReferenceIndex:
+    """
+    Búsqueda lineal sin índice con la misma semántica que SearchIndex.
+    """
+    def __init__(self):
+        self.users = {}
+        self.notes = {}
+
+    def fields(self, key: str) -> str:
+        notes = self.notes.get(key)
+        return f"{self.users[key]}\0{notes}" if notes else self.users[key]
+
+    def search(self, query: str, fuzzy: bool, in_fields: bool) -> list:
+        query = query.lower().strip()
+        keys = sorted(self.users, key=lambda key: (key.lower(), key))
+        if not query:
+            return keys
+        if not fuzzy:
+            return [key for key in keys if query in key.lower() or (in_fields and query in self.fields(key))]
+        scored = []
+        for key in keys:
+            span = subsequence_span(key.lower(), query)
+            if span is not None:
+                scored.append((span[1], key.lower(), key))
+            elif in_fields:
+                span = subsequence_span(self.fields(key), query)
+                if span is not None:
+                    scored.append((len(key) + span[1] - span[0], key.lower(), key))
+        return [key for _, _, key in sorted(scored)]
+
+def random_text(rng: random.Random, size: int) -> str:
+    return "".join(rng.choice("abcAB-1é") for _ in range(rng.randint(1, size)))
+
+def test_matches_a_linear_scan_while_typing_and_editing():
+    rng = random.Random(5)
+    index, reference = SearchIndex(), ReferenceIndex()
+    users = {random_text(rng, 6): random_text(rng, 5) for _ in range(300)}
+    index.build(users.items())
+    reference.users = {key: user.lower() for key, user in users.items()}
+    for _ in range(1500):
+        action = rng.random()
+        if action < 0.1:
+            key, user = random_text(rng, 6), random_text(rng, 5)
+            notes = random_text(rng, 8) if reference.notes and rng.random() < 0.5 else None
+            index.put(key, user, notes)
+            reference.users[key] = user.lower()
+            if notes:
+                reference.notes[key] = notes.lower()
+            else:
+                reference.notes.pop(key, None)
+        elif action < 0.15 and reference.users:
+            key = rng.choice(sorted(reference.users))
+            index.remove(key)
+            del reference.users[key]
+            reference.notes.pop(key, None)
+        elif action < 0.17:
+            notes = {key: random_text(rng, 8) for key in reference.users if rng.random() < 0.5}
+            index.set_notes(notes.items())
+            reference.notes = {key: text.lower() for key, text in notes.items()}
+        elif action < 0.18:
+            index.clear_notes()
+            reference.notes = {}
+        query, fuzzy, in_fields = random_text(rng, 4), rng.random() < 0.4, rng.random() < 0.3
+        for length in range(1, len(query) + 1):
+            # Each keystroke may narrow the previous result instead of scanning everything
+            assert index.search(query[:length], fuzzy, in_fields) == reference.search(query[:length], fuzzy, in_fields)
+
+def test_fuzzy_ranks_tighter_and_earlier_matches_first():
+    index = SearchIndex()
+    index.build([("Gmail", ""), ("Google Mail", ""), ("Amazon", ""), ("xgmlx", "")])
+    assert index.search("gml", fuzzy=True) == ["xgmlx", "Gmail", "Google Mail"]
+    assert index.search("gmail") == ["Gmail"]
+
+def test_notes_are_searched_only_while_loaded():
+    index = SearchIndex()
+    index.build([("github", "ana"), ("gmail", "luis")])
+    assert index.search("luis", in_fields=True) == ["gmail"]
+    index.set_notes([("github", "Clave de Recuperación")])
+    assert index.search("recuperación", in_fields=True) == ["github"]
+    assert index.search("recuperación") == []
+    index.clear_notes()
+    assert index.search("recuperación", in_fields=True) == []
+
+def test_batch_update_matches_single_puts():
+    rng = random.Random(7)
+    users = {random_text(rng, 6): random_text(rng, 5) for _ in range(200)}
+    batched, single = SearchIndex(), SearchIndex()
+    batched.build(users.items())
+    single.build(users.items())
+    removed = rng.sample(sorted(users), 40)
+    changes = {random_text(rng, 6): (random_text(rng, 5), random_text(rng, 8)) for _ in range(80)}
+    changes = {key: value for key, value in changes.items() if key not in removed}
+    batched.update(changes, removed)
+    for key, (user, notes) in changes.items():
+        single.put(key, user, notes)
+    for key in removed:
+        single.remove(key)
+    for query in ("a", "b-", "ab", "1é", "aab"):
+        for fuzzy in (False, True):
+            assert batched.search(query, fuzzy, True) == single.search(query, fuzzy, True)
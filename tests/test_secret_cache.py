@@ -0,0 +1,33 @@
+import vault
+from vault import SecretCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SecretCache(maxsize=2, ttl=60)
+    cache.put("a", {"password": "1"})
+    cache.put("b", {"password": "2"})
+    assert cache.get("a") == {"password": "1"} # "b" is now the least recently used
+    cache.put("c", {"password": "3"})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"password": "1"}
+    assert len(cache) == 2
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(vault.time, "monotonic", clock)
+    cache = SecretCache(maxsize=8, ttl=10)
+    cache.put("a", {"password": "1"})
+    clock.now += 5
+    cache.put("b", {"password": "2"})
+    clock.now += 6
+    assert cache.get("a") is None
+    assert cache.get("b") == {"password": "2"}
+    clock.now += 5
+    cache.purge_expired()
+    assert len(cache) == 0
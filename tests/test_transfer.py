@@ -0,0 +1,79 @@
+import io
+import json
+
+import pytest
+
+import transfer
+from conftest import MASTER_PASSWORD
+from transfer import JsonStream
+from vault import open_vault
+
+DOCUMENT = {
+    "github": {"username": "ana", "password": "p\"a\\sñ 🔑", "notes": "línea 1\nlínea 2"},
+    "números": [0, -12, 3.5e-7, 123456789012345678, True, None],
+    "vacío": {},
+    "lista": [],
+}
+
+def stream_object(text: str, chunk_size: int) -> dict:
+    stream = JsonStream(io.StringIO(text), chunk_size=chunk_size)
+    return {key: stream.value() for key in stream.object_keys()}
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 64])
+def test_values_split_across_chunks(chunk_size):
+    text = json.dumps(DOCUMENT, ensure_ascii=False, indent=1)
+    assert stream_object(text, chunk_size) == DOCUMENT
+
+@pytest.mark.parametrize("chunk_size", range(1, 12))
+def test_number_cut_at_a_chunk_boundary(chunk_size):
+    stream = JsonStream(io.StringIO("[12345678901, 2.5e10, 7]"), chunk_size=chunk_size)
+    assert list(stream.array_items()) == [12345678901, 2.5e10, 7]
+
+def test_truncated_document_is_an_error():
+    with pytest.raises(ValueError):
+        stream_object('{"github": {"password": "sin cerrar', 4)
+
+def test_export_import_round_trip(vault_path, tmp_path):
+    entries = {service: data for service, data in DOCUMENT.items() if service == "github"}
+    entries["gmail"] = {"username": "", "password": "dos", "notes": ""}
+    with open_vault(MASTER_PASSWORD, vault_path, create=True) as store:
+        store.apply_batch(entries.items())
+        export_path = str(tmp_path / "export.json")
+        assert transfer.export_file(store, export_path) == 2
+
+    other = open_vault(MASTER_PASSWORD, str(tmp_path / "otra.enc"), create=True)
+    stats = transfer.import_file(other, export_path)
+    assert stats["imported"] == 2
+    assert dict(other.items()) == entries
+
+@pytest.mark.parametrize("chunk_size", range(1, 9))
+def test_every_kind_of_token_split_across_chunks(chunk_size):
+    text = json.dumps([True, False, None, -0.5e-3, "é\U0001f511\"\\", {"a": [1, 2]}])
+    assert list(JsonStream(io.StringIO(text), chunk_size=chunk_size).array_items()) == json.loads(text)
+
+class CountingReader(io.StringIO):
+    def __init__(self, text: str):
+        super().__init__(text)
+        self.reads = 0
+
+    def read(self, size: int = -1) -> str:
+        self.reads += 1
+        return super().read(size)
+
+@pytest.mark.parametrize("bad_value", ["tru", "[1 2]", "{\"a\" 1}", "bad"])
+def test_malformed_value_fails_without_reading_the_rest(bad_value):
+    text = '{"github": ' + bad_value + ', "gmail": {"password": "x"}' + ', "otro": {}' * 10000 + "}"
+    reader = CountingReader(text)
+    stream = JsonStream(reader, chunk_size=4096)
+    with pytest.raises(ValueError):
+        for _ in stream.object_keys():
+            stream.value()
+    assert reader.reads == 1 # The error is in the first chunk; the rest of the file is never read
+
+def test_overwrite_counts_a_service_repeated_in_the_file_once(vault_path):
+    store = open_vault(MASTER_PASSWORD, vault_path, create=True)
+    entries = [("github", {"password": "uno"}), ("github", {"password": "dos"})]
+    stats = transfer.import_entries(store, entries, on_conflict="overwrite")
+    assert stats == {"imported": 1, "skipped": 0}
+    assert len(store) == 1
+    assert store.get_secret("github")["password"] == "dos"
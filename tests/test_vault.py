@@ -0,0 +1,62 @@
+import os
+
+import vault
+from conftest import MASTER_PASSWORD
+from vault import open_vault
+
+def entry(password: str, username: str = "ana", notes: str = "") -> dict:
+    return {"username": username, "password": password, "notes": notes}
+
+def record_count(path: str) -> int:
+    with open(path, "rb") as f:
+        return f.read().count(b"\n") - 1 # Minus the header
+
+# --- Log replay ---
+def test_reopen_replays_puts_updates_and_deletes(vault_path):
+    with open_vault(MASTER_PASSWORD, vault_path, create=True) as store:
+        store.put("github", entry("uno"))
+        store.put("gmail", entry("dos"))
+        store.flush()
+        store.put("github", entry("tres", notes="nota"))
+        store.delete("gmail")
+
+    store = open_vault(MASTER_PASSWORD, vault_path)
+    assert list(store.services()) == ["github"]
+    assert store.get("github") == entry("tres", notes="nota")
+    assert store.get_meta("github") == {"username": "ana"}
+    assert record_count(vault_path) == 4
+
+# --- Compaction ---
+def test_compaction_keeps_one_record_per_entry(vault_path):
+    with open_vault(MASTER_PASSWORD, vault_path, create=True) as store:
+        for i in range(vault.COMPACT_MIN_DEAD_RECORDS + 1):
+            store.put("github", entry(f"version-{i}"))
+            store.put("gmail", entry("fija"))
+            store.flush()
+        # Superseded records crossed the threshold, so the file was rewritten
+        assert record_count(vault_path) <= vault.COMPACT_MIN_DEAD_RECORDS
+        store.compact()
+        assert record_count(vault_path) == 2
+        assert os.path.exists(vault_path + ".bak.1")
+
+    store = open_vault(MASTER_PASSWORD, vault_path)
+    assert store.get("github") == entry(f"version-{vault.COMPACT_MIN_DEAD_RECORDS}")
+    assert store.get("gmail") == entry("fija")
+
+# --- Torn writes ---
+def test_torn_tail_is_ignored_and_overwritten(vault_path):
+    with open_vault(MASTER_PASSWORD, vault_path, create=True) as store:
+        store.put("github", entry("uno"))
+    with open(vault_path, "ab") as f:
+        f.write(b"gAAAAAtornrecordwithoutnewline")
+
+    store = open_vault(MASTER_PASSWORD, vault_path)
+    assert list(store.services()) == ["github"]
+    store.put("gmail", entry("dos"))
+    store.flush()
+    with open(vault_path, "rb") as f:
+        assert b"torn" not in f.read()
+
+    store = open_vault(MASTER_PASSWORD, vault_path)
+    assert store.get("gmail") == entry("dos")
+    assert store.get("github") == entry("uno")
@@ -0,0 +1,334 @@
+"""
+Importación y exportación masiva de entradas en formatos de otros gestores.
+
+Lectores (todos por streaming, con memoria acotada aunque el archivo sea grande):
+    csv        columnas genéricas (service, username, password, notes) y las de
+               Bitwarden (name, login_username, login_password, notes) o KeePass
+               ("Account", "Login Name", "Password", "Comments")
+    json       el formato propio {servicio: {username, password, notes}}
+    bitwarden  exportación JSON sin cifrar de Bitwarden ({"items": [...]})
+    list       lista JSON de objetos planos con las mismas columnas que el CSV
+
+Todo lo importado se aplica con VaultStore.apply_batch: una sola transacción y un
+solo anexado en disco, sin importar cuántas entradas traiga el archivo.
+"""
+import csv
+import io
+import itertools
+import json
+import re
+
+# --- Constants ---
+READ_CHUNK_SIZE = 64 * 1024
+DETECT_SIZE = 4096
+PROGRESS_EVERY = 500
+FORMATS = ("auto", "csv", "json", "bitwarden", "list")
+EXPORT_FORMATS = ("json", "csv", "bitwarden")
+CONFLICT_POLICIES = ("skip", "overwrite", "rename")
+ENTRY_FIELDS = ("username", "password", "notes")
+BITWARDEN_KEYS = re.compile(r'"(?:encrypted|folders|collections)"\s*:|"items"\s*:\s*\[')
+NUMBER_CHARS = frozenset("0123456789+-.eE") # Characters that may continue a JSON number in the next chunk
+JSON_LITERALS = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+UNICODE_ESCAPE_CHARS = frozenset("\\u0123456789abcdefABCDEF")
+
+# Column aliases, compared in lowercase
+FIELD_ALIASES = {
+    "service": ("service", "name", "title", "account", "servicio"),
+    "username": ("username", "login_username", "login name", "user name", "user", "usuario"),
+    "password": ("password", "login_password", "contraseña"),
+    "notes": ("notes", "comments", "notas"),
+}
+
+def normalize_record(record: dict):
+    """
+    Convierte un registro plano con cualquiera de los alias de columna en (servicio, entrada).
+    Devuelve None si no tiene nombre de servicio.
+    """
+    lowered = {str(key).strip().lower(): value for key, value in record.items()}
+    values = {}
+    for field, aliases in FIELD_ALIASES.items():
+        values[field] = next((lowered[alias] for alias in aliases if lowered.get(alias)), "")
+    service = str(values.pop("service")).strip()
+    if not service:
+        return None
+    return service, {field: str(values[field] or "") for field in ENTRY_FIELDS}
+
+# --- Readers ---
+class JsonStream:
+    """
+    Lector JSON incremental: decodifica valor a valor sobre un búfer que se rellena por bloques.
+    """
+    def __init__(self, f, chunk_size: int = READ_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Siguiente carácter significativo (sin consumirlo); cadena vacía al final del archivo.
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"JSON no válido: se esperaba '{char}' y se encontró '{found or 'fin del archivo'}'")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                # Only a value cut at the end of the buffer is read further; malformed JSON fails right away
+                if not self._cut_at_end(e) or not self._fill():
+                    raise
+                continue
+            if not self.eof and isinstance(value, (int, float)) and NUMBER_CHARS.issuperset(self.buffer[end:]):
+                # A number cut at the chunk boundary ("12", "2." or "2.5e") would decode as a shorter one
+                if self._fill():
+                    continue
+            self.pos = end
+            return value
+
+    def _cut_at_end(self, error: json.JSONDecodeError) -> bool:
+        """
+        Indica si el error se debe a que el búfer termina a mitad de un valor (cadena, número, literal o escape).
+        """
+        rest = self.buffer[error.pos:]
+        return (not rest or error.msg.startswith("Unterminated string") or NUMBER_CHARS.issuperset(rest)
+                or any(literal.startswith(rest) for literal in JSON_LITERALS)
+                or (error.msg.startswith("Invalid \\uXXXX escape") and UNICODE_ESCAPE_CHARS.issuperset(rest)))
+
+    def _separator(self, closing: str) -> bool:
+        char = self.peek()
+        if char == ",":
+            self.pos += 1
+            return True
+        self.expect(closing)
+        return False
+
+    def array_items(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if not self._separator("]"):
+                return
+
+    def object_keys(self):
+        """
+        Recorre las claves de un objeto; tras cada clave el llamante debe leer su valor.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("JSON no válido: clave de objeto no textual")
+            self.expect(":")
+            yield key
+            if not self._separator("}"):
+                return
+
+def read_csv(f):
+    for row in csv.DictReader(f):
+        entry = normalize_record(row)
+        if entry is not None:
+            yield entry
+
+def read_json(f):
+    stream = JsonStream(f)
+    for service in stream.object_keys():
+        data = stream.value()
+        if isinstance(data, dict) and service:
+            yield service, {field: str(data.get(field) or "") for field in ENTRY_FIELDS}
+
+def read_json_list(f):
+    for record in JsonStream(f).array_items():
+        entry = normalize_record(record) if isinstance(record, dict) else None
+        if entry is not None:
+            yield entry
+
+def read_bitwarden(f):
+    stream = JsonStream(f)
+    for key in stream.object_keys():
+        if key != "items":
+            stream.value() # Folders, collections... are small; decode and drop them
+            continue
+        for item in stream.array_items():
+            if not isinstance(item, dict):
+                continue
+            service = str(item.get("name") or "").strip()
+            if not service:
+                continue
+            login = item.get("login") or {}
+            yield service, {
+                "username": str(login.get("username") or ""),
+                "password": str(login.get("password") or ""),
+                "notes": str(item.get("notes") or ""),
+            }
+
+class PrefixedReader:
+    """
+    Devuelve primero 'prefix' y después el resto de 'f'; permite detectar el formato en stdin.
+    """
+    def __init__(self, prefix: str, f):
+        self.prefix = prefix
+        self.f = f
+
+    def read(self, size: int = -1) -> str:
+        if self.prefix:
+            data, self.prefix = self.prefix, ""
+            return data
+        return self.f.read(size)
+
+def detect_format(head: str) -> str:
+    """
+    Deduce el formato por el primer carácter y, en JSON, por las claves de Bitwarden.
+    """
+    stripped = head.lstrip()
+    if stripped.startswith("["):
+        return "list"
+    if not stripped.startswith("{"):
+        return "csv"
+    if BITWARDEN_KEYS.search(head):
+        return "bitwarden"
+    return "json"
+
+READERS = {"csv": read_csv, "json": read_json, "bitwarden": read_bitwarden, "list": read_json_list}
+
+def read_entries(f, fmt: str, path: str = ""):
+    """
+    Devuelve un iterador perezoso de (servicio, entrada) con el lector del formato indicado.
+    """
+    if fmt == "auto" and path.lower().endswith(".csv"):
+        fmt = "csv"
+    elif fmt == "auto":
+        head = f.read(DETECT_SIZE)
+        fmt = detect_format(head)
+        # Put the sniffed text back without seeking, so pipes work as well as files
+        if fmt == "csv":
+            f = itertools.chain(io.StringIO(head + f.readline()), f)
+        else:
+            f = PrefixedReader(head, f)
+    if fmt not in READERS:
+        raise ValueError(f"Formato desconocido: {fmt}")
+    return READERS[fmt](f)
+
+# --- Writers ---
+def write_csv(f, entries):
+    writer = csv.writer(f)
+    writer.writerow(("service", *ENTRY_FIELDS))
+    for service, data in entries:
+        writer.writerow((service, *(data.get(field, "") for field in ENTRY_FIELDS)))
+
+def write_json(f, entries):
+    f.write("{")
+    separator = "\n"
+    for service, data in entries:
+        entry = {field: data.get(field, "") for field in ENTRY_FIELDS}
+        f.write(f"{separator}    {json.dumps(service, ensure_ascii=False)}: {json.dumps(entry, ensure_ascii=False)}")
+        separator = ",\n"
+    f.write("\n}\n")
+
+def write_bitwarden(f, entries):
+    f.write('{"encrypted": false, "folders": [], "items": [')
+    separator = "\n"
+    for service, data in entries:
+        item = {
+            "type": 1,
+            "name": service,
+            "notes": data.get("notes") or None,
+            "login": {"username": data.get("username", ""), "password": data.get("password", "")},
+        }
+        f.write(separator + "    " + json.dumps(item, ensure_ascii=False))
+        separator = ",\n"
+    f.write("\n]}\n")
+
+WRITERS = {"csv": write_csv, "json": write_json, "bitwarden": write_bitwarden}
+
+# --- Vault operations ---
+def _resolve_conflicts(vault, entries, on_conflict: str, stats: dict):
+    seen = set()
+    for service, data in entries:
+        if service in seen or service in vault:
+            if on_conflict == "skip":
+                stats["skipped"] += 1
+                continue
+            if on_conflict == "rename":
+                number = 2
+                while f"{service} ({number})" in seen or f"{service} ({number})" in vault:
+                    number += 1
+                service = f"{service} ({number})"
+        if service not in seen:
+            stats["imported"] += 1 # With "overwrite", a service repeated in the file replaces its earlier copy
+        seen.add(service)
+        yield service, data
+
+def import_entries(vault, entries, on_conflict: str = "skip", progress=None) -> dict:
+    """
+    Importa un iterable de (servicio, entrada) en una sola transacción.
+
+    'on_conflict' decide qué hacer con los servicios repetidos (ya en la bóveda o en el
+    propio archivo): "skip" los omite, "overwrite" se queda con el último y "rename"
+    los añade como "servicio (2)". 'progress(n)' recibe el número de entradas procesadas.
+    Devuelve {"imported": n, "skipped": n}.
+    """
+    if on_conflict not in CONFLICT_POLICIES:
+        raise ValueError(f"Política de conflicto desconocida: {on_conflict}")
+    stats = {"imported": 0, "skipped": 0}
+    vault.apply_batch(_resolve_conflicts(vault, entries, on_conflict, stats), progress, PROGRESS_EVERY)
+    return stats
+
+def export_entries(vault, f, fmt: str = "json", progress=None) -> int:
+    """
+    Escribe todas las entradas en claro en 'f', descifrándolas por bloques.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Formato de exportación desconocido: {fmt}")
+    count = 0
+    def counted():
+        nonlocal count
+        for item in vault.items():
+            count += 1
+            if progress is not None and count % PROGRESS_EVERY == 0:
+                progress(count)
+            yield item
+    WRITERS[fmt](f, counted())
+    if progress is not None:
+        progress(count)
+    return count
+
+def import_file(vault, path: str, fmt: str = "auto", on_conflict: str = "skip", progress=None) -> dict:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return import_entries(vault, read_entries(f, fmt, path), on_conflict, progress)
+
+def export_file(vault, path: str, fmt: str = "json", progress=None) -> int:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        return export_entries(vault, f, fmt, progress)
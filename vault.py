@@ -0,0 +1,825 @@
+import os
+import json
+import base64
+import time
+import shutil
+import hashlib
+import threading
+import contextlib
+from collections import OrderedDict
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+from cryptography.hazmat.backends import default_backend
+import diagnostics
+from diagnostics import timed
+from registry import DEFAULT_VAULT_FILE
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+# --- Constants ---
+DATA_FILE = DEFAULT_VAULT_FILE # Classic single-vault location; named vaults are resolved by registry.py
+MASTER_PASSWORD_SALT_FILE = "salt.bin" # Legacy salt, next to the vault; only read to migrate old vaults
+VAULT_MAGIC = b"GCVAULT"
+VAULT_FORMAT_BLOB = 1 # Whole vault as a single Fernet token
+VAULT_FORMAT_LOG = 2 # Header followed by one encrypted record per line
+VAULT_FORMAT_LAZY = 3 # Like LOG, but each record keeps its secret fields in a separate token
+VAULT_FORMAT_VERSION = VAULT_FORMAT_LAZY
+DEFAULT_KDF = "pbkdf2-sha256"
+DEFAULT_KDF_ITERATIONS = 100000
+COMPACT_MIN_DEAD_RECORDS = 64 # Never compact for fewer superseded records than this
+JOURNAL_MAGIC = b"GCJOURNAL"
+JOURNAL_SUFFIX = ".journal"
+BACKUP_COUNT = 3 # Rotating copies (.bak.1 is the newest) kept whenever the vault file is rewritten
+SECRET_FIELDS = ("password", "notes") # Decrypted on demand, never at unlock
+SECRET_CACHE_SIZE = 32
+SECRET_CACHE_TTL = 120.0 # Seconds a decrypted secret may stay in memory
+LOCK_SUFFIX = ".lock"
+LOCK_TIMEOUT = 10.0 # Seconds to wait while another process writes the vault
+LOCK_POLL_INTERVAL = 0.05
+TOKEN_TAIL_SIZE = 32 # Trailing bytes of a Fernet token (its HMAC) identify it without decrypting
+
+# --- Vault Header / Key Derivation ---
+def new_kdf_params(kdf: str = DEFAULT_KDF) -> dict:
+    """
+    Crea parámetros KDF nuevos (con salt aleatorio) para una bóveda.
+    """
+    params = {"name": kdf, "salt": base64.b64encode(os.urandom(16)).decode()}
+    if kdf == "pbkdf2-sha256":
+        params["iterations"] = DEFAULT_KDF_ITERATIONS
+    elif kdf == "scrypt":
+        params.update({"n": 2 ** 15, "r": 8, "p": 1})
+    else:
+        raise ValueError(f"KDF no soportado: {kdf}")
+    return params
+
+@timed("kdf")
+def derive_key(master_password: str, kdf_params: dict) -> bytes:
+    """
+    Deriva la clave Fernet (codificada en base64) a partir de la contraseña maestra y los parámetros KDF de la cabecera.
+    """
+    salt = base64.b64decode(kdf_params["salt"])
+    name = kdf_params["name"]
+    if name == "pbkdf2-sha256":
+        kdf = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=salt,
+            iterations=kdf_params["iterations"],
+            backend=default_backend()
+        )
+    elif name == "scrypt":
+        kdf = Scrypt(salt=salt, length=32, n=kdf_params["n"], r=kdf_params["r"], p=kdf_params["p"], backend=default_backend())
+    else:
+        raise ValueError(f"KDF no soportado: {name}")
+    return base64.urlsafe_b64encode(kdf.derive(master_password.encode()))
+
+@timed("io.read_vault")
+def read_vault_file(path: str = DATA_FILE):
+    """
+    Lee la bóveda de disco una sola vez y devuelve (cabecera, cuerpo, offset_del_cuerpo).
+    Las bóvedas antiguas sin cabecera usan el salt de 'salt.bin' y PBKDF2 con 100000 iteraciones.
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    diagnostics.add("io.bytes_read", len(raw))
+    if raw.startswith(VAULT_MAGIC + b" "):
+        header_line, _, body = raw.partition(b"\n")
+        header = json.loads(header_line[len(VAULT_MAGIC) + 1:])
+        if header.get("version", 0) > VAULT_FORMAT_VERSION:
+            raise ValueError(f"Versión de bóveda no soportada: {header.get('version')}")
+        return header, body, len(header_line) + 1
+    with open(os.path.join(os.path.dirname(path), MASTER_PASSWORD_SALT_FILE), "rb") as f:
+        salt = f.read()
+    legacy_params = {"name": "pbkdf2-sha256", "salt": base64.b64encode(salt).decode(), "iterations": DEFAULT_KDF_ITERATIONS}
+    return {"version": 0, "kdf": legacy_params}, raw, 0
+
+def header_verifier(header_line: bytes):
+    """
+    Token verificador de una línea de cabecera (None si no es una cabecera válida o no lo tiene).
+    """
+    if not header_line.startswith(VAULT_MAGIC + b" "):
+        return None
+    try:
+        return json.loads(header_line[len(VAULT_MAGIC) + 1:]).get("verifier")
+    except ValueError:
+        return None
+
+def encode_vault_header(kdf_params: dict, verifier: bytes = None) -> bytes:
+    header = {"version": VAULT_FORMAT_VERSION, "kdf": kdf_params}
+    if verifier is not None:
+        header["verifier"] = verifier.decode()
+    return VAULT_MAGIC + b" " + json.dumps(header, separators=(",", ":")).encode() + b"\n"
+
+# --- Durability Helpers ---
+def fsync_directory(path: str):
+    """
+    Persiste la entrada de directorio tras un rename (solo POSIX; en Windows no es posible abrir directorios).
+    """
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def rotate_backups(path: str, count: int = BACKUP_COUNT):
+    """
+    Copia 'path' a 'path.bak.1' desplazando las copias anteriores (la más antigua se descarta).
+    """
+    if count <= 0 or not os.path.exists(path):
+        return
+    for i in range(count - 1, 0, -1):
+        older = f"{path}.bak.{i}"
+        if os.path.exists(older):
+            os.replace(older, f"{path}.bak.{i + 1}")
+    shutil.copy2(path, f"{path}.bak.1")
+
+@timed("io.rewrite")
+def atomic_write(path: str, chunks, backups: int = BACKUP_COUNT):
+    """
+    Escribe el archivo completo en un temporal, hace fsync y lo renombra sobre 'path'.
+    Un corte a mitad de escritura deja intacta la versión anterior.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    rotate_backups(path, backups)
+    os.replace(tmp_path, path)
+    fsync_directory(path)
+
+@timed("io.journal")
+def write_journal(path: str, payload: bytes, base_offset: int):
+    """
+    Registra en el journal un lote de registros a anexar en 'base_offset' y lo persiste (fsync).
+    """
+    header = {"base_offset": base_offset, "length": len(payload), "sha256": hashlib.sha256(payload).hexdigest()}
+    with open(path + JOURNAL_SUFFIX, "wb") as f:
+        f.write(JOURNAL_MAGIC + b" " + json.dumps(header, separators=(",", ":")).encode() + b"\n")
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    # The journal is a new file: its directory entry must be durable before the vault is touched,
+    # or a power cut could leave part of the batch in the vault with no journal to complete it
+    fsync_directory(path)
+
+def recover_journal(path: str) -> bool:
+    """
+    Reaplica un lote interrumpido. Si el journal está completo, el archivo se trunca en el offset
+    original y el lote se vuelve a escribir entero; si está incompleto, el lote nunca llegó a la
+    bóveda y se descarta. Devuelve True si se reaplicó un lote.
+    """
+    journal_path = path + JOURNAL_SUFFIX
+    if not os.path.exists(journal_path):
+        return False
+    with open(journal_path, "rb") as f:
+        header_line, _, payload = f.read().partition(b"\n")
+    replayed = False
+    try:
+        header = json.loads(header_line[len(JOURNAL_MAGIC) + 1:])
+        complete = (header_line.startswith(JOURNAL_MAGIC + b" ") and len(payload) == header["length"]
+                    and hashlib.sha256(payload).hexdigest() == header["sha256"])
+    except (ValueError, KeyError):
+        complete = False
+    if complete:
+        with open(path, "r+b") as f:
+            f.seek(header["base_offset"])
+            f.write(payload)
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+        replayed = True
+    os.remove(journal_path)
+    fsync_directory(path)
+    return replayed
+
+# --- Inter-process Locking ---
+def file_state(path: str):
+    """
+    Generación observable del archivo: (inodo, tamaño, mtime). Un anexado cambia el tamaño
+    y una reescritura atómica el inodo. None si el archivo no existe.
+    """
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return info.st_ino, info.st_size, info.st_mtime_ns
+
+def _lock_fd(fd: int, shared: bool):
+    if os.name == "nt":
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1) # No shared mode on Windows; readers lock exclusively
+    else:
+        fcntl.flock(fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+
+def _unlock_fd(fd: int):
+    if os.name == "nt":
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+class FileLock:
+    """
+    Cerrojo consultivo entre procesos sobre '<bóveda>.lock' (flock en POSIX, msvcrt en Windows).
+
+    Va en un archivo aparte porque las reescrituras sustituyen el archivo de la bóveda.
+    Es reentrante dentro del proceso: las adquisiciones anidadas conservan el primer cerrojo.
+    """
+    def __init__(self, path: str):
+        self.path = path + LOCK_SUFFIX
+        self._fd = None
+        self._depth = 0
+
+    @contextlib.contextmanager
+    def hold(self, shared: bool = False, timeout: float = LOCK_TIMEOUT):
+        if self._depth == 0:
+            self._acquire(shared, timeout)
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                _unlock_fd(self._fd)
+                os.close(self._fd)
+                self._fd = None
+
+    def _acquire(self, shared: bool, timeout: float):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                _lock_fd(fd, shared)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    os.close(fd)
+                    raise TimeoutError(f"La bóveda está en uso por otro proceso: {self.path}")
+                time.sleep(LOCK_POLL_INTERVAL)
+        self._fd = fd
+
+# --- Secret Cache ---
+class SecretCache:
+    """
+    Caché LRU acotada de secretos descifrados, con expiración por tiempo.
+
+    Tiene su propio cerrojo: la interfaz purga y vacía la caché desde el hilo de Tk
+    mientras el hilo de la bóveda la invalida.
+    """
+    def __init__(self, maxsize: int = SECRET_CACHE_SIZE, ttl: float = SECRET_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: dict):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def purge_expired(self):
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, (expires_at, _) in self._items.items() if expires_at < now]:
+                del self._items[key]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+# --- Record Log Storage ---
+class RecordMismatch(ValueError):
+    """
+    El registro leído pertenece a otro servicio: el offset venía de una versión anterior del archivo.
+    """
+
+def decrypt_secret_line(fernet: Fernet, line: bytes, service: str = None) -> dict:
+    """
+    Descifra el token secreto (contraseña y notas) de una línea ``<metadatos> <secreto>``.
+    Con 'service', rechaza el registro si su token pertenece a otro servicio.
+    """
+    secret_token = line.rstrip(b"\n").partition(b" ")[2]
+    with diagnostics.timer("crypto.decrypt"):
+        plaintext = fernet.decrypt(secret_token)
+    with diagnostics.timer("json.loads"):
+        secret = json.loads(plaintext)
+    owner = secret.pop("service", None) # Absent in records written before it was added
+    if service is not None and owner is not None and owner != service:
+        raise RecordMismatch(f"El registro leído para '{service}' pertenece a otro servicio")
+    return secret
+
+def split_entry(data: dict):
+    """
+    Separa una entrada en (metadatos, secreto). Solo los metadatos se descifran al desbloquear.
+    """
+    meta = {k: v for k, v in data.items() if k not in SECRET_FIELDS}
+    secret = {k: v for k, v in data.items() if k in SECRET_FIELDS}
+    return meta, secret
+
+class VaultStore:
+    """
+    Bóveda basada en un log cifrado de solo-anexado con descifrado perezoso.
+
+    Cada línea después de la cabecera es un registro. Un alta/modificación es
+    ``<token metadatos> <token secreto>``: el primero cifra
+    ``{"op": "put", "service": ..., "meta": {...}}`` y el segundo la contraseña y las notas.
+    Un borrado es un único token ``{"op": "del", "service": ...}``.
+
+    Al desbloquear solo se descifran los metadatos; el índice ``service -> (offset, longitud)``
+    apunta al registro vigente, de modo que el secreto se lee y descifra bajo demanda
+    (con una caché LRU acotada) y la compactación copia las líneas vivas sin volver a cifrarlas.
+
+    Los cambios se aplican en memoria al instante y quedan pendientes hasta ``flush()``,
+    que escribe de una vez el último registro de cada entrada modificada. Así una ráfaga
+    de ediciones produce una sola escritura, que puede hacerse desde otro hilo.
+
+    Durabilidad: cada lote se registra primero en un journal (con fsync) y luego se anexa
+    a la bóveda (con fsync); si el proceso muere a mitad, el lote se reaplica al abrir.
+    Las reescrituras completas (compactación, migración) son atómicas: temporal + fsync +
+    rename, conservando copias de seguridad rotativas.
+    """
+    def __init__(self, path: str, key: bytes, kdf_params: dict):
+        self.path = path
+        self.key = key
+        self.fernet = Fernet(key)
+        self.kdf_params = kdf_params
+        self.secret_cache = SecretCache()
+        self._meta = {}
+        self._index = {}
+        self._pending = {} # service -> (record, line, secret) not yet written to disk
+        self._dead_records = 0
+        self._end_offset = 0 # End of the last complete record; appends start here
+        self._tails = {} # service -> tail of its current metadata token, to reuse decrypted metadata on reload
+        self._file_state = None # file_state() as of our last read or write
+        self._verifier = None # Header verifier token; every full rewrite gets a new one
+        self._lock = threading.RLock()
+        self.file_lock = FileLock(path)
+
+    @classmethod
+    def create(cls, master_password: str, path: str = DATA_FILE, kdf: str = DEFAULT_KDF) -> "VaultStore":
+        """
+        Crea una bóveda vacía en 'path' con parámetros KDF nuevos.
+        """
+        kdf_params = new_kdf_params(kdf)
+        store = cls(path, derive_key(master_password, kdf_params), kdf_params)
+        store.compact()
+        return store
+
+    @classmethod
+    def open(cls, master_password: str = None, path: str = DATA_FILE, key: bytes = None) -> "VaultStore":
+        """
+        Deriva la clave una única vez (o usa 'key', p. ej. la que guarda el agente),
+        lee el archivo una vez y reconstruye el índice.
+        Lanza InvalidToken si la contraseña maestra o la clave son incorrectas.
+        """
+        # Only reading the bytes happens under the lock; decryption does not block other instances.
+        with FileLock(path).hold():
+            recover_journal(path)
+            state = file_state(path)
+            header, body, body_offset = read_vault_file(path)
+        version = header.get("version", 0)
+        if key is None:
+            key = derive_key(master_password, header["kdf"])
+        store = cls(path, key, header["kdf"])
+        if "verifier" in header:
+            store.fernet.decrypt(header["verifier"].encode()) # Rejects a wrong password even on an empty vault
+        if version == VAULT_FORMAT_VERSION:
+            store._replay(body, body_offset)
+            store._file_state = state
+            store._verifier = header.get("verifier")
+        else:
+            # Older formats hold secrets inline; convert them once so later unlocks stay lazy.
+            store._rewrite(store._decrypt_legacy(version, body))
+        return store
+
+    def _decrypt_legacy(self, version: int, body: bytes) -> dict:
+        if version < VAULT_FORMAT_LOG:
+            return json.loads(self.fernet.decrypt(body).decode())
+        entries = {}
+        for line in body.split(b"\n"):
+            if line:
+                record = json.loads(self.fernet.decrypt(line))
+                if record["op"] == "put":
+                    entries[record["service"]] = record["data"]
+                else:
+                    entries.pop(record["service"], None)
+        return entries
+
+    @timed("vault.replay") # Decrypt + JSON of every metadata token; not split per record to keep unlock lean
+    def _replay(self, body: bytes, offset: int, known: dict = None, touched: set = None, target: tuple = None):
+        """
+        Aplica los registros de 'body'. Los que aparecen en 'known' (cola del token -> registro)
+        no se descifran; los servicios de los registros descifrados se añaden a 'touched'.
+        'target' son los diccionarios (metadatos, índice, colas) a rellenar; por defecto, los vigentes.
+        """
+        lines = body.split(b"\n")
+        # A last segment without its newline is a torn write; the next flush overwrites it.
+        for line in lines[:-1]:
+            if line:
+                meta_token = line.partition(b" ")[0]
+                tail = meta_token[-TOKEN_TAIL_SIZE:]
+                record = known.get(tail) if known else None
+                if record is None:
+                    record = json.loads(self.fernet.decrypt(meta_token))
+                    if touched is not None:
+                        touched.add(record["service"])
+                self._apply(record, offset, len(line) + 1, tail, target)
+            offset += len(line) + 1
+        self._end_offset = offset
+        diagnostics.add("vault.records_replayed", len(lines) - 1)
+
+    def _apply(self, record: dict, offset: int, length: int, tail: bytes = None, target: tuple = None):
+        meta, index, tails = target or (self._meta, self._index, self._tails)
+        service = record["service"]
+        # A local edit not yet written wins over what is on disk, so its metadata is left alone
+        keep_meta = service in self._pending
+        if record["op"] == "put":
+            if service in index:
+                self._dead_records += 1
+            if not keep_meta:
+                meta[service] = record["meta"]
+            index[service] = (offset, length)
+            tails[service] = tail
+        else:
+            if not keep_meta:
+                meta.pop(service, None)
+            tails.pop(service, None)
+            if index.pop(service, None) is not None:
+                self._dead_records += 1
+            self._dead_records += 1 # The tombstone itself is dead weight too
+
+    def _encode_put(self, service: str, data: dict) -> bytes:
+        meta, secret = split_entry(data)
+        meta_record = {"op": "put", "service": service, "meta": meta}
+        with diagnostics.timer("json.dumps"):
+            meta_json = json.dumps(meta_record, separators=(",", ":")).encode()
+            # The service name is sealed in the secret token too, so a stale offset cannot return another entry's secret
+            secret_json = json.dumps({"service": service, **secret}, separators=(",", ":")).encode()
+        with diagnostics.timer("crypto.encrypt"):
+            return self.fernet.encrypt(meta_json) + b" " + self.fernet.encrypt(secret_json) + b"\n"
+
+    def _encode_delete(self, service: str):
+        record = {"op": "del", "service": service}
+        return record, self.fernet.encrypt(json.dumps(record, separators=(",", ":")).encode()) + b"\n"
+
+    # --- Read API ---
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    def __contains__(self, service: str) -> bool:
+        return service in self._meta
+
+    def services(self):
+        return self._meta.keys()
+
+    def get_meta(self, service: str, default=None):
+        return self._meta.get(service, default)
+
+    @property
+    def has_pending_writes(self) -> bool:
+        return bool(self._pending)
+
+    def get_secret(self, service: str) -> dict:
+        """
+        Devuelve la contraseña y las notas de 'service', leyendo y descifrando solo su registro.
+        """
+        with self._lock:
+            secret = self.secret_cache.get(service)
+            if secret is None:
+                secret = self._read_secret(service)
+                self.secret_cache.put(service, secret)
+            return secret
+
+    @contextlib.contextmanager
+    def _current_file(self):
+        """
+        Abre la bóveda con el cerrojo compartido tras comprobar que es la versión que describe
+        el índice (mismo estado y mismo verificador de cabecera); si otro proceso la cambió,
+        se relee antes. Así ningún offset del índice apunta a un registro ajeno.
+        """
+        with self._lock, self.file_lock.hold(shared=True):
+            f = open(self.path, "rb")
+            try:
+                if file_state(self.path) != self._file_state or header_verifier(f.readline()) != self._verifier:
+                    f.close()
+                    self.refresh(force=True)
+                    f = open(self.path, "rb")
+                yield f
+            finally:
+                f.close()
+
+    def _read_secret(self, service: str, f=None) -> dict:
+        if service in self._pending:
+            return self._pending[service][2]
+        if f is None:
+            with self._current_file() as f:
+                return self._read_secret(service, f)
+        offset, length = self._index[service]
+        with diagnostics.timer("io.read_secret"):
+            f.seek(offset)
+            line = f.read(length)
+        return decrypt_secret_line(self.fernet, line, service)
+
+    def revision(self, service: str):
+        """
+        Identificador de la versión actual de la entrada, sin descifrar nada: cambia con cada
+        guardado (es la cola del token de metadatos). None si no se conoce.
+        """
+        with self._lock:
+            if service in self._pending:
+                return self._pending[service][1].partition(b" ")[0][-TOKEN_TAIL_SIZE:]
+            return self._tails.get(service)
+
+    def secret_locations(self, services) -> tuple:
+        """
+        Separa 'services' en los que tienen el secreto en disco, como (servicio, offset, longitud),
+        y los que solo están en memoria; permite que otros procesos los descifren por su cuenta.
+        """
+        located, in_memory = [], []
+        with self._current_file(): # Offsets handed out must match the file as it is now
+            for service in services:
+                if service in self._pending or service not in self._index:
+                    in_memory.append(service)
+                else:
+                    located.append((service, *self._index[service]))
+        return located, in_memory
+
+    def get(self, service: str, default=None):
+        """
+        Devuelve la entrada completa (metadatos + secreto descifrado bajo demanda).
+        """
+        if service not in self._meta:
+            return default
+        return {**self._meta[service], **self.get_secret(service)}
+
+    def items(self, chunk_size: int = 256, services=None):
+        """
+        Itera todas las entradas completas (o solo las de 'services'); descifra cada secreto sin llenar la caché.
+        Lee por bloques para no bloquear las escrituras de otros hilos durante todo el recorrido.
+        """
+        services = list(self._meta if services is None else services)
+        for start in range(0, len(services), chunk_size):
+            chunk = []
+            with self._current_file() as f:
+                for service in services[start:start + chunk_size]:
+                    if service in self._meta:
+                        chunk.append((service, {**self._meta[service], **self._read_secret(service, f)}))
+            yield from chunk
+
+    def lock(self):
+        """
+        Descarta los secretos descifrados en memoria.
+        """
+        self.secret_cache.clear()
+
+    def refresh(self, force: bool = False) -> set:
+        """
+        Incorpora los cambios que otros procesos hayan escrito desde nuestra última lectura.
+
+        Si solo se anexaron registros, lee y descifra únicamente la cola nueva. Si la bóveda
+        se reescribió (compactación), los metadatos de los registros que ya conocíamos se
+        reutilizan sin descifrarlos. Los cambios locales pendientes prevalecen.
+        Con 'force' se comprueba el archivo aunque su estado no haya cambiado.
+        Devuelve los servicios que cambiaron.
+        """
+        with self._lock:
+            if self._file_state is None:
+                return set()
+            with self.file_lock.hold(shared=True):
+                state = file_state(self.path)
+                if state is None or (state == self._file_state and not force):
+                    return set()
+                # Same inode and no shrink suggests a pure append; the verifier rules out a reused inode
+                appended = state[0] == self._file_state[0] and state[1] >= self._end_offset
+                if appended:
+                    with open(self.path, "rb") as f:
+                        appended = header_verifier(f.readline()) == self._verifier
+                        f.seek(self._end_offset)
+                        tail = f.read()
+                if not appended:
+                    header, body, body_offset = read_vault_file(self.path)
+            touched = set()
+            if appended:
+                self._replay(tail, self._end_offset, touched=touched)
+            else:
+                self._reload(header, body, body_offset, touched)
+            self._file_state = state
+            for service in touched:
+                self.secret_cache.invalidate(service)
+            return touched
+
+    def _reload(self, header: dict, body: bytes, body_offset: int, touched: set):
+        if header.get("version") != VAULT_FORMAT_VERSION:
+            raise ValueError(f"Versión de bóveda inesperada: {header.get('version')}")
+        # Compaction copies lines verbatim, so unchanged records keep their exact tokens
+        known = {
+            tail: {"op": "put", "service": service, "meta": self._meta[service]}
+            for service, tail in self._tails.items() if service not in self._pending and service in self._meta
+        }
+        # Built aside and swapped in at the end: the Tk thread reads _meta without the lock
+        meta = {service: self._meta[service] for service in self._pending if service in self._meta}
+        index, tails = {}, {}
+        self._dead_records = 0
+        self._replay(body, body_offset, known, touched, (meta, index, tails))
+        touched.update(self._meta.keys() - meta.keys())
+        self._meta, self._index, self._tails = meta, index, tails
+        self._verifier = header.get("verifier")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        self.lock()
+
+    # --- Write API ---
+    def put(self, service: str, data: dict):
+        meta, secret = split_entry(data)
+        line = self._encode_put(service, data)
+        with self._lock:
+            self._meta[service] = meta
+            self._pending[service] = ({"op": "put", "service": service, "meta": meta}, line, secret)
+            self.secret_cache.invalidate(service)
+
+    def delete(self, service: str):
+        with self._lock:
+            if service not in self._meta:
+                return
+            del self._meta[service]
+            self.secret_cache.invalidate(service)
+            if service in self._index:
+                record, line = self._encode_delete(service)
+                self._pending[service] = (record, line, None)
+            else:
+                self._pending.pop(service, None) # Never reached the disk, nothing to tombstone
+
+    def flush(self):
+        """
+        Escribe en un único anexado todos los cambios pendientes (el último de cada entrada).
+        Si la escritura falla, los cambios siguen pendientes para el próximo intento.
+        """
+        with self._lock:
+            if not self._pending:
+                return
+            self._append([(record, line) for record, line, _ in self._pending.values()])
+            self._pending = {}
+            self._compact_if_needed()
+
+    @timed("vault.apply_batch")
+    def apply_batch(self, changes, progress=None, progress_every: int = 500) -> int:
+        """
+        Aplica un lote de cambios (servicio, datos, o None para borrar) como una única transacción.
+
+        Los registros se cifran a medida que llega el iterable, sin tomar el cerrojo ni
+        guardar secretos en claro, y se escriben con un solo anexado. Si el iterable falla
+        a mitad o la escritura no llega a disco, la bóveda queda como estaba.
+        Devuelve el número de cambios aplicados.
+        """
+        staged = {}
+        for count, (service, data) in enumerate(changes, 1):
+            if data is None:
+                staged[service] = None
+            else:
+                meta, _ = split_entry(data)
+                staged[service] = ({"op": "put", "service": service, "meta": meta}, self._encode_put(service, data))
+            if progress is not None and count % progress_every == 0:
+                progress(count)
+        with self._lock:
+            self.flush() # Keep earlier single-entry edits ordered before the batch
+            batch = []
+            for service, item in staged.items():
+                if item is None:
+                    if service in self._index:
+                        batch.append(self._encode_delete(service))
+                else:
+                    batch.append(item)
+            if batch:
+                self._append(batch)
+                for service in staged:
+                    self.secret_cache.invalidate(service)
+                self._compact_if_needed()
+        if progress is not None:
+            progress(len(staged))
+        return len(staged)
+
+    def _sync_for_write(self):
+        """
+        Con el cerrojo exclusivo: completa el lote que otro proceso dejara a medias e
+        incorpora sus cambios, para anexar justo detrás de su último registro.
+        """
+        recover_journal(self.path)
+        self.refresh()
+
+    @timed("io.append")
+    def _append(self, batch: list):
+        """
+        Anexa los registros (registro, línea) con el diario de escritura y actualiza el índice.
+        """
+        payload = b"".join(line for _, line in batch)
+        diagnostics.add("io.bytes_written", len(payload))
+        with self.file_lock.hold():
+            self._sync_for_write()
+            offset = self._end_offset
+            # Group commit: one journal fsync and one vault fsync for the whole batch
+            write_journal(self.path, payload, offset)
+            with open(self.path, "r+b") as f:
+                f.seek(offset)
+                f.write(payload)
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+            os.remove(self.path + JOURNAL_SUFFIX)
+            self._file_state = file_state(self.path)
+        self._end_offset = offset + len(payload)
+        for record, line in batch:
+            self._apply(record, offset, len(line), line.partition(b" ")[0][-TOKEN_TAIL_SIZE:])
+            offset += len(line)
+
+    def _compact_if_needed(self):
+        if self._dead_records >= max(COMPACT_MIN_DEAD_RECORDS, len(self._meta)):
+            self.compact()
+
+    @timed("vault.compact")
+    def compact(self):
+        """
+        Reescribe la bóveda con un único registro por entrada viva, copiando las líneas cifradas tal cual.
+        """
+        with self._lock:
+            self.flush()
+            with self.file_lock.hold():
+                self._sync_for_write()
+                lines = {}
+                if self._index:
+                    with open(self.path, "rb") as f:
+                        for service, (offset, length) in self._index.items():
+                            f.seek(offset)
+                            lines[service] = f.read(length)
+                self._write_file(lines)
+
+    def _rewrite(self, entries: dict):
+        self.secret_cache.clear()
+        self._meta = {service: split_entry(data)[0] for service, data in entries.items()}
+        self._write_file({service: self._encode_put(service, data) for service, data in entries.items()})
+
+    def _write_file(self, lines: dict):
+        verifier = self.fernet.encrypt(VAULT_MAGIC)
+        header = encode_vault_header(self.kdf_params, verifier)
+        new_index = {}
+        offset = len(header)
+        for service, line in lines.items():
+            new_index[service] = (offset, len(line))
+            offset += len(line)
+        with self.file_lock.hold():
+            atomic_write(self.path, [header, *lines.values()])
+            self._file_state = file_state(self.path)
+        self._index = new_index
+        self._tails = {service: line.partition(b" ")[0][-TOKEN_TAIL_SIZE:] for service, line in lines.items()}
+        self._end_offset = offset
+        self._dead_records = 0
+        self._verifier = verifier.decode()
+
+# --- Public API ---
+def open_vault(master_password: str = None, path: str = DATA_FILE, create: bool = False, key: bytes = None) -> VaultStore:
+    """
+    Abre la bóveda de 'path' (o la crea si no existe y 'create' es True).
+    Con 'key' (una clave ya derivada) no se necesita la contraseña maestra.
+    Punto de entrada de la API para scripts: no depende de la interfaz gráfica.
+
+        with open_vault(password) as vault:
+            print(vault.get_secret("github")["password"])
+    """
+    if not os.path.exists(path):
+        if not create:
+            raise FileNotFoundError(f"No existe la bóveda: {path}")
+        return VaultStore.create(master_password, path)
+    return VaultStore.open(master_password, path, key=key)